@@ -0,0 +1,167 @@
+"""
+Archival tiering for old posts.
+
+Posts older than ARCHIVE_AFTER_DAYS are moved, together with their comments and
+likes, into the `*_archive` tables so the hot tables and their indexes only
+cover recent data. Soft-deleted posts and comments are purged instead of
+copied, whatever their age. Each batch is one transaction:
+
+    python -m app.archive run --older-than-days 365 --batch-size 500
+
+Reads of an archived post id fall back to the archive tables (see
+GET /posts/{post_id} and GET /comments/{post_id}).
+"""
+import argparse
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int) -> int:
+    """
+    Move up to `batch_size` posts created before `cutoff`, and purge soft-deleted
+    ones of any age; returns how many were handled.
+    """
+    post_ids = [
+        post_id
+        for (post_id,) in db.query(models.Post.id)
+        .filter(or_(models.Post.timestamp < cutoff, models.Post.deleted_at.isnot(None)))
+        .order_by(models.Post.id)
+        .limit(batch_size)
+    ]
+    if not post_ids:
+        return 0
+
+    posts = (
+        db.query(models.Post.id, models.Post.title, models.Post.content, models.Post.timestamp, models.Post.owner_id)
+        .filter(models.Post.id.in_(post_ids), models.Post.deleted_at.is_(None))
+        .all()
+    )
+    live_ids = [post.id for post in posts]
+
+    if live_ids:
+        attachment_ids = defaultdict(list)
+        for attachment_id, post_id in (
+            db.query(models.Attachment.id, models.Attachment.post_id)
+            .filter(models.Attachment.post_id.in_(live_ids))
+            .order_by(models.Attachment.id)
+        ):
+            attachment_ids[post_id].append(str(attachment_id))
+
+        db.execute(insert(models.PostArchive), [
+            {
+                "id": post.id,
+                "title": post.title,
+                "content": post.content,
+                "timestamp": post.timestamp,
+                "owner_id": post.owner_id,
+                "attachment_ids": ",".join(attachment_ids[post.id]),
+            }
+            for post in posts
+        ])
+        comments = models.Comment.__table__
+        db.execute(
+            insert(models.CommentArchive).from_select(
+                ["id", "content", "timestamp", "owner_id", "post_id"],
+                select(comments.c.id, comments.c.content, comments.c.timestamp, comments.c.owner_id, comments.c.post_id)
+                .where(comments.c.post_id.in_(live_ids), comments.c.deleted_at.is_(None)),
+            )
+        )
+        likes = models.Like.__table__
+        db.execute(
+            insert(models.LikeArchive).from_select(
+                ["user_id", "post_id"],
+                select(likes.c.user_id, likes.c.post_id).where(likes.c.post_id.in_(live_ids)),
+            )
+        )
+
+    # Children first; attachments stay (their files are shared) but are detached
+    for model in (models.Hashtag, models.Mention, models.Like, models.Retweet, models.Comment, models.PostScore):
+        db.execute(delete(model).where(model.post_id.in_(post_ids)))
+    db.execute(update(models.Attachment).where(models.Attachment.post_id.in_(post_ids)).values(post_id=None))
+    db.execute(delete(models.Post).where(models.Post.id.in_(post_ids)))
+    for post in posts:
+        invalidation.stage(db, "post", post.id, "archived", owner_id=post.owner_id)
+    db.commit()
+    return len(post_ids)
+
+
+def purge_deleted_comments(db: Session, batch_size: int) -> int:
+    """Delete up to `batch_size` soft-deleted comments of live posts; returns how many."""
+    comment_ids = [
+        comment_id
+        for (comment_id,) in db.query(models.Comment.id)
+        .filter(models.Comment.deleted_at.isnot(None))
+        .order_by(models.Comment.id)
+        .limit(batch_size)
+    ]
+    if comment_ids:
+        for model in (models.Hashtag, models.Mention):
+            db.execute(delete(model).where(model.comment_id.in_(comment_ids)))
+        db.execute(delete(models.Comment).where(models.Comment.id.in_(comment_ids)))
+        db.commit()
+    return len(comment_ids)
+
+
+def archive(db: Session, older_than_days: int, batch_size: int = 500) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    total = 0
+    while moved := archive_batch(db, cutoff, batch_size):
+        total += moved
+        db.expunge_all()
+    while purge_deleted_comments(db, batch_size):
+        pass
+    return total
+
+
+def load_attachments(db: Session, post: models.PostArchive) -> list[models.Attachment]:
+    ids = [int(attachment_id) for attachment_id in post.attachment_ids.split(",") if attachment_id]
+    if not ids:
+        return []
+    return db.query(models.Attachment).filter(models.Attachment.id.in_(ids)).order_by(models.Attachment.id).all()
+
+
+def delete_user_rows(db: Session, user_id: int):
+    """Remove a user's archived posts, comments and likes. Call before deleting the user."""
+    own_posts = select(models.PostArchive.id).where(models.PostArchive.owner_id == user_id)
+    db.execute(delete(models.CommentArchive).where(
+        or_(models.CommentArchive.owner_id == user_id, models.CommentArchive.post_id.in_(own_posts))
+    ))
+    db.execute(delete(models.LikeArchive).where(
+        or_(models.LikeArchive.user_id == user_id, models.LikeArchive.post_id.in_(own_posts))
+    ))
+    db.execute(delete(models.PostArchive).where(models.PostArchive.owner_id == user_id))
+
+
+def main():
+    from .config import get_settings
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="move old posts, their comments and likes to the archive tables")
+    run.add_argument("--older-than-days", type=int, default=settings.archive_after_days)
+    run.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    args = parser.parse_args()
+
+    from .database import SessionLocal, get_engine
+    from .eventlog import get_writer
+    from . import versions  # noqa: F401  bumps list versions with each archived batch
+
+    get_engine()
+    event_log = get_writer()  # web workers only log their own writes, so this process logs its own
+    try:
+        with SessionLocal() as db:
+            moved = archive(db, args.older_than_days, args.batch_size)
+    finally:
+        if event_log is not None:
+            event_log.stop()
+    print(f"archived {moved} posts older than {args.older_than_days} days or deleted")
+
+
+if __name__ == "__main__":
+    main()
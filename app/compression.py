@@ -0,0 +1,120 @@
+"""
+Negotiated response compression.
+
+A pure ASGI middleware: brotli (`Brotli` in requirements.txt) when the client
+accepts it, gzip otherwise, and gzip as well if brotli is not importable. Only complete (single-message) bodies of a
+text-like type and at least COMPRESSION_MINIMUM_SIZE bytes are compressed;
+streamed responses such as /live/stream and file downloads pass through
+untouched.
+"""
+import gzip
+import importlib.util
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import get_settings
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # the higher levels cost far more CPU for a few percent
+
+_COMPRESSIBLE = ("application/json", "application/javascript", "application/xml", "image/svg+xml", "text/")
+
+
+def _brotli():
+    if importlib.util.find_spec("brotli") is None:
+        return None
+    import brotli
+
+    return brotli
+
+
+def negotiate(accept_encoding: str, brotli_available: bool) -> str | None:
+    """Pick "br" or "gzip" from an Accept-Encoding header, or None for identity."""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    if brotli_available and weights.get("br", wildcard) > 0:
+        return "br"
+    if weights.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int | None = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli = _brotli()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.brotli is not None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        if self.minimum_size is None:
+            # Read lazily so building the app never touches the environment
+            self.minimum_size = get_settings().compression_minimum_size
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.brotli)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, brotli):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.brotli = brotli
+        self._start: Message | None = None
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body message shows whether the body is complete
+            self._start = message
+            return
+        if self._start is None or message["type"] != "http.response.body":
+            await self._flush_start()
+            await self._send(message)
+            return
+
+        start, self._start = self._start, None
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        compressible = headers.get("content-type", "").startswith(_COMPRESSIBLE)
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        if (
+            not compressible
+            or message.get("more_body", False)
+            or "content-encoding" in headers
+            or len(body) < self.minimum_size
+        ):
+            await self._send(start)
+            await self._send(message)
+            return
+
+        if self.encoding == "br":
+            body = self.brotli.compress(body, quality=BROTLI_QUALITY)
+        else:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(body))
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": body})
+
+    async def _flush_start(self):
+        if self._start is not None:
+            start, self._start = self._start, None
+            await self._send(start)
@@ -0,0 +1,116 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+from dotenv import load_dotenv
+
+
+def _csv(value: str | None) -> list[str]:
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+
+def _flag(value: str | None) -> bool:
+    return (value or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_url: str | None = None
+    replica_urls: list[str] = field(default_factory=list)
+    replica_eject_seconds: float = 30
+    read_your_writes_seconds: float = 5
+    auto_migrate: bool = False
+
+    secret_key: str | None = None
+    algorithm: str = "HS256"
+    bcrypt_rounds: int = 12
+    access_token_expire_minutes: int = 30
+
+    trending_half_life_hours: float = 6
+    trending_capacity: int = 200
+    trending_flush_seconds: float = 30
+
+    invalidation_bus_url: str = ""
+    invalidation_poll_seconds: float = 0.2
+
+    live_queue_size: int = 100
+
+    media_root: str = "./media"
+    media_max_bytes: int = 10 * 1024 * 1024
+    media_thumbnail_size: int = 320
+    media_thumbnail_workers: int = 2
+    media_accel_redirect_prefix: str = ""
+
+    compression_minimum_size: int = 1024
+
+    notification_bucket_minutes: int = 60
+    notification_batch_size: int = 500
+    notification_flush_seconds: float = 1.0
+    notification_background: bool = True  # False: events wait for NotificationWorker.drain() (tests)
+
+    profile_cache_size: int = 256
+    profile_cache_seconds: float = 30
+
+    archive_after_days: int = 365
+    archive_batch_size: int = 500
+
+    event_log_dir: str = "./eventlog"
+    event_log_segment_bytes: int = 64 * 1024 * 1024
+    event_log_flush_seconds: float = 0.05
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        env = os.environ
+        return cls(
+            database_url=env.get("DATABASE_URL"),
+            replica_urls=_csv(env.get("DATABASE_REPLICA_URLS")),
+            replica_eject_seconds=float(env.get("REPLICA_EJECT_SECONDS", 30)),
+            read_your_writes_seconds=float(env.get("READ_YOUR_WRITES_SECONDS", 5)),
+            auto_migrate=_flag(env.get("AUTO_MIGRATE")),
+            secret_key=env.get("SECRET_KEY"),
+            algorithm=env.get("ALGORITHM", "HS256"),
+            bcrypt_rounds=int(env.get("BCRYPT_ROUNDS", 12)),
+            access_token_expire_minutes=int(env.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30)),
+            trending_half_life_hours=float(env.get("TRENDING_HALF_LIFE_HOURS", 6)),
+            trending_capacity=int(env.get("TRENDING_CAPACITY", 200)),
+            trending_flush_seconds=float(env.get("TRENDING_FLUSH_SECONDS", 30)),
+            invalidation_bus_url=env.get("INVALIDATION_BUS_URL", ""),
+            invalidation_poll_seconds=float(env.get("INVALIDATION_POLL_SECONDS", 0.2)),
+            live_queue_size=int(env.get("LIVE_QUEUE_SIZE", 100)),
+            media_root=env.get("MEDIA_ROOT", "./media"),
+            media_max_bytes=int(env.get("MEDIA_MAX_BYTES", 10 * 1024 * 1024)),
+            media_thumbnail_size=int(env.get("MEDIA_THUMBNAIL_SIZE", 320)),
+            media_thumbnail_workers=int(env.get("MEDIA_THUMBNAIL_WORKERS", 2)),
+            media_accel_redirect_prefix=env.get("MEDIA_ACCEL_REDIRECT_PREFIX", ""),
+            compression_minimum_size=int(env.get("COMPRESSION_MINIMUM_SIZE", 1024)),
+            notification_bucket_minutes=int(env.get("NOTIFICATION_BUCKET_MINUTES", 60)),
+            notification_batch_size=int(env.get("NOTIFICATION_BATCH_SIZE", 500)),
+            notification_flush_seconds=float(env.get("NOTIFICATION_FLUSH_SECONDS", 1.0)),
+            notification_background=_flag(env.get("NOTIFICATION_BACKGROUND", "1")),
+            profile_cache_size=int(env.get("PROFILE_CACHE_SIZE", 256)),
+            profile_cache_seconds=float(env.get("PROFILE_CACHE_SECONDS", 30)),
+            archive_after_days=int(env.get("ARCHIVE_AFTER_DAYS", 365)),
+            archive_batch_size=int(env.get("ARCHIVE_BATCH_SIZE", 500)),
+            event_log_dir=env.get("EVENT_LOG_DIR", "./eventlog"),
+            event_log_segment_bytes=int(env.get("EVENT_LOG_SEGMENT_BYTES", 64 * 1024 * 1024)),
+            event_log_flush_seconds=float(env.get("EVENT_LOG_FLUSH_SECONDS", 0.05)),
+        )
+
+
+_installed: Settings | None = None
+
+
+def install_settings(settings: Settings | None):
+    """Use `settings` instead of the environment (application factory, tests); None reverts."""
+    global _installed
+    _installed = settings
+    get_settings.cache_clear()
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Load .env and the environment exactly once per process."""
+    if _installed is not None:
+        return _installed
+    load_dotenv()  # ✅ Load environment variables
+    return Settings.from_env()
@@ -1,27 +1,185 @@
-import os
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from functools import lru_cache
+from typing import Callable
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.orm import Session, sessionmaker
 
-# ✅ Load environment variables from the .env file
-load_dotenv()
+from .config import get_settings
 
-# ✅ Get the URL from env
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not SQLALCHEMY_DATABASE_URL:
-    raise ValueError("DATABASE_URL is not set. Check your .env file!")
+def _create_engine(url: str):
+    # SQLite files are handy local stand-ins; their connections cross threads here
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    # ✅ No special args needed for PostgreSQL
+    return create_engine(url)
 
-# ✅ No special args needed for PostgreSQL
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Bound to the engine on first use, so importing the app never touches the database
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+
+_installed_engine = None
+
+
+def install_engine(engine):
+    """Use an existing engine (application factory, tests) instead of DATABASE_URL; None reverts."""
+    global _installed_engine
+    _installed_engine = engine
+    get_engine.cache_clear()
+    get_replica_router.cache_clear()
+
+
+@lru_cache
+def get_engine():
+    engine = _installed_engine
+    if engine is None:
+        url = get_settings().database_url
+        if not url:
+            raise ValueError("DATABASE_URL is not set. Check your .env file!")
+        engine = _create_engine(url)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+def upsert(db: Session, table, rows: list[dict], conflict_columns: list, values: Callable[[object], dict]):
+    """
+    INSERT `rows` into `table`; rows that collide on `conflict_columns` are
+    updated with `values(new)` instead, where `new` names the values that
+    failed to insert (MySQL's `inserted`, PostgreSQL/SQLite's `excluded`).
+    MySQL matches on any unique key, so `conflict_columns` must be one.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(values(stmt.inserted))
+    else:
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(index_elements=conflict_columns, set_=values(stmt.excluded))
+    db.execute(stmt)
+
+
+class ReplicaRouter:
+    """
+    Hands out sessions for read-only handlers.
+
+    Replicas are picked round-robin; one that fails to connect is ejected for
+    `eject_seconds`. A client that wrote within the last `sticky_seconds` reads
+    from the primary so it always sees its own writes despite replica lag.
+    """
+
+    def __init__(self, urls: list[str], eject_seconds: float, sticky_seconds: float):
+        self.replicas = [
+            sessionmaker(autocommit=False, autoflush=False, bind=_create_engine(url)) for url in urls
+        ]
+        self.eject_seconds = eject_seconds
+        self.sticky_seconds = sticky_seconds
+        self._cursor = itertools.count()
+        self._ejected_until: dict[int, float] = {}
+        self._last_write: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_write(self, key: str | None):
+        if not key:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._last_write[key] = now
+            if len(self._last_write) > 10_000:
+                cutoff = now - self.sticky_seconds
+                self._last_write = {k: t for k, t in self._last_write.items() if t > cutoff}
+
+    def is_sticky(self, key: str | None) -> bool:
+        if not key:
+            return False
+        with self._lock:
+            wrote_at = self._last_write.get(key)
+        return wrote_at is not None and time.monotonic() - wrote_at < self.sticky_seconds
+
+    def eject(self, replica: int):
+        with self._lock:
+            self._ejected_until[replica] = time.monotonic() + self.eject_seconds
+
+    def _healthy_order(self) -> list[int]:
+        start = next(self._cursor)
+        now = time.monotonic()
+        with self._lock:
+            order = [(start + offset) % len(self.replicas) for offset in range(len(self.replicas))]
+            return [i for i in order if self._ejected_until.get(i, 0) <= now]
+
+    def session(self, key: str | None) -> tuple[Session, int | None]:
+        """Return (session, replica index), falling back to the primary (None)."""
+        if self.replicas and not self.is_sticky(key):
+            for replica in self._healthy_order():
+                db = self.replicas[replica]()
+                try:
+                    db.connection()
+                except OperationalError:
+                    db.close()
+                    self.eject(replica)
+                    continue
+                return db, replica
+        return SessionLocal(), None
+
+
+@lru_cache
+def get_replica_router() -> ReplicaRouter:
+    settings = get_settings()
+    return ReplicaRouter(
+        settings.replica_urls,
+        settings.replica_eject_seconds,
+        settings.read_your_writes_seconds,
+    )
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _start_read_your_writes_window(session):
+    # Stamp at commit time so the client's very next read already goes to the primary
+    if session.info.pop("wrote", False):
+        get_replica_router().mark_write(session.info.get("client_key"))
+
+
+def _client_key(request: Request) -> str | None:
+    return request.headers.get("authorization")
+
+
+def get_db(request: Request):
+    get_engine()
+    db = SessionLocal(info={"client_key": _client_key(request)})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only handlers; routed to a replica when one is configured."""
+    get_engine()
+    replica_router = get_replica_router()
+    db, replica = replica_router.session(_client_key(request))
     try:
         yield db
+    except OperationalError:
+        if replica is not None:
+            replica_router.eject(replica)
+        raise
     finally:
         db.close()
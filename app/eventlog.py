@@ -0,0 +1,310 @@
+"""
+Append-only log of every write, kept off the request path.
+
+Each process records the events it publishes on the invalidation bus (posts,
+deletes, likes, comments, follows, sign-ups, uploads, notifications read, and
+archiving by `python -m app.archive`) as one compact JSON line:
+
+    {"ts":1700000000.123,"seq":42,"entity":"post","id":7,"action":"liked","data":{"user_id":3,"owner_id":1}}
+
+A background thread writes whatever queued up within EVENT_LOG_FLUSH_SECONDS in
+one go and fsyncs once for the whole group, so a burst of writes costs one
+fsync rather than one per request. Segments are rotated at
+EVENT_LOG_SEGMENT_BYTES and never reopened; every worker writes its own
+segments into EVENT_LOG_DIR, named by the time they were opened and the pid.
+
+The reader merges all segments by timestamp and rebuilds derived state from
+scratch:
+
+    python -m app.eventlog cat --entity post
+    python -m app.eventlog replay --user 3
+    python -m app.eventlog replay --apply
+"""
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+from . import invalidation
+from .config import get_settings
+from .workers import BatchWorker
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT = re.compile(r"^segment-(\d+)-(\d+)\.jsonl$")
+
+
+def encode(event: invalidation.Event, ts: float) -> bytes:
+    record = {"ts": round(ts, 6), "seq": event.seq, "entity": event.entity, "id": event.entity_id, "action": event.action}
+    if event.data:
+        record["data"] = event.data
+    return json.dumps(record, separators=(",", ":"), default=str).encode() + b"\n"
+
+
+class EventLogWriter(BatchWorker):
+    thread_name = "event-log"
+
+    def __init__(self, directory: str, segment_bytes: int, flush_seconds: float, batch_size: int = 1000):
+        super().__init__(batch_size, flush_seconds)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._file = None
+        self._size = 0
+        self._stamp = 0
+
+    def item_for(self, event: invalidation.Event) -> bytes:
+        return encode(event, time.time())
+
+    def _open_segment(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Strictly increasing, so two rotations within a millisecond get distinct names
+        self._stamp = max(int(time.time() * 1000), self._stamp + 1)
+        name = f"segment-{self._stamp:013d}-{os.getpid()}.jsonl"
+        # "x": a segment is never appended to after rotation or a restart
+        self._file = open(os.path.join(self.directory, name), "xb")
+        self._size = 0
+        # Make the new directory entry durable too, not just the file's contents
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, lines: list[bytes]):
+        """Append `lines` to the current segment with a single fsync."""
+        data = b"".join(lines)
+        if self._file is not None and self._size and self._size + len(data) > self.segment_bytes:
+            self.close()
+        if self._file is None:
+            self._open_segment()
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._size += len(data)
+
+
+@lru_cache
+def get_writer() -> EventLogWriter | None:
+    """The worker's event log writer, or None when EVENT_LOG_DIR is empty."""
+    settings = get_settings()
+    if not settings.event_log_dir:
+        return None
+    writer = EventLogWriter(
+        settings.event_log_dir,
+        segment_bytes=settings.event_log_segment_bytes,
+        flush_seconds=settings.event_log_flush_seconds,
+    )
+    invalidation.subscribe(writer.on_event)
+    return writer
+
+
+def segments(directory: str) -> dict[str, list[str]]:
+    """Segment paths per writing process, oldest first."""
+    by_pid = defaultdict(list)
+    for name in sorted(os.listdir(directory)):
+        if match := _SEGMENT.match(name):
+            by_pid[match.group(2)].append(os.path.join(directory, name))
+    return by_pid
+
+
+def _read_segment(path: str) -> Iterator[dict]:
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Only the tail of a segment cut short by a crash should be unreadable
+                logger.warning("Skipping unreadable record %s:%d", path, number)
+
+
+def read_records(directory: str) -> Iterator[dict]:
+    """Every record in `directory`, merged across workers by timestamp."""
+    streams = [
+        itertools.chain.from_iterable(_read_segment(path) for path in paths)
+        for paths in segments(directory).values()
+    ]
+    return heapq.merge(*streams, key=lambda record: record["ts"])
+
+
+@dataclass
+class Replay:
+    """Counters and timelines rebuilt from the log."""
+
+    users: set[int] = field(default_factory=set)  # created within the log
+    followers: defaultdict[int, set[int]] = field(default_factory=lambda: defaultdict(set))
+    following: defaultdict[int, set[int]] = field(default_factory=lambda: defaultdict(set))
+    likes: defaultdict[int, set[int]] = field(default_factory=lambda: defaultdict(set))
+    comments: defaultdict[int, dict[int, int]] = field(default_factory=lambda: defaultdict(dict))  # post -> comment -> owner
+    posts: dict[int, tuple[int, float]] = field(default_factory=dict)  # post id -> (owner, created ts)
+    posts_by_owner: defaultdict[int, list[int]] = field(default_factory=lambda: defaultdict(list))
+    archived: set[int] = field(default_factory=set)
+
+    def apply(self, record: dict):
+        entity, entity_id, action = record["entity"], record["id"], record["action"]
+        data = record.get("data", {})
+        if entity == "post":
+            if action == "created":
+                self.posts[entity_id] = (data["owner_id"], record["ts"])
+                self.posts_by_owner[data["owner_id"]].append(entity_id)
+            elif action == "deleted":
+                self._forget_post(entity_id)
+            elif action == "archived":
+                self.archived.add(entity_id)
+            elif action == "liked":
+                self.likes[entity_id].add(data["user_id"])
+            elif action == "unliked":
+                self.likes[entity_id].discard(data["user_id"])
+        elif entity == "comment":
+            if action == "created":
+                self.comments[data["post_id"]][entity_id] = data["owner_id"]
+            elif action == "deleted":
+                self.comments[data["post_id"]].pop(entity_id, None)
+        elif entity == "user":
+            if action == "created":
+                self.users.add(entity_id)
+            elif action == "followed":
+                self.followers[entity_id].add(data["follower_id"])
+                self.following[data["follower_id"]].add(entity_id)
+            elif action == "unfollowed":
+                self.followers[entity_id].discard(data["follower_id"])
+                self.following[data["follower_id"]].discard(entity_id)
+            elif action == "deleted":
+                self._forget_user(entity_id)
+
+    def _forget_post(self, post_id: int):
+        owner_id, _ = self.posts.pop(post_id, (None, None))
+        if owner_id is not None:
+            self.posts_by_owner[owner_id].remove(post_id)
+        self.likes.pop(post_id, None)
+        self.comments.pop(post_id, None)
+        self.archived.discard(post_id)
+
+    def _forget_user(self, user_id: int):
+        self.users.discard(user_id)
+        for followee in self.following.pop(user_id, set()):
+            self.followers[followee].discard(user_id)
+        for follower in self.followers.pop(user_id, set()):
+            self.following[follower].discard(user_id)
+        for post_id in list(self.posts_by_owner.pop(user_id, [])):
+            self._forget_post(post_id)
+        for likers in self.likes.values():
+            likers.discard(user_id)
+        for owners in self.comments.values():
+            for comment_id in [comment_id for comment_id, owner_id in owners.items() if owner_id == user_id]:
+                del owners[comment_id]
+
+    def last_post_at(self, user_id: int) -> datetime | None:
+        own = self.posts_by_owner.get(user_id)
+        if not own:
+            return None
+        return datetime.fromtimestamp(self.posts[own[-1]][1], tz=timezone.utc)
+
+    def timeline(self, user_id: int, limit: int = 20) -> list[int]:
+        """Live posts of the accounts `user_id` follows, newest first."""
+        newest_first = (reversed(self.posts_by_owner.get(followee, [])) for followee in self.following.get(user_id, ()))
+        merged = heapq.merge(*newest_first, key=lambda post_id: self.posts[post_id][1], reverse=True)
+        return list(itertools.islice((post_id for post_id in merged if post_id not in self.archived), limit))
+
+
+def replay(records: Iterable[dict]) -> Replay:
+    state = Replay()
+    for record in records:
+        state.apply(record)
+    return state
+
+
+def apply_stats(db, state: Replay) -> int:
+    """
+    Overwrite the user_stats rows of the users created within the log. Their
+    whole history is in it, so the rebuilt counters are exact; older accounts
+    are left alone. Returns how many rows were written.
+    """
+    from sqlalchemy import update
+
+    from . import models
+
+    existing = {
+        user_id
+        for (user_id,) in db.query(models.UserStats.user_id).filter(models.UserStats.user_id.in_(state.users))
+    }
+    rows = [
+        {
+            "user_id": user_id,
+            "post_count": len(state.posts_by_owner.get(user_id, ())),
+            "follower_count": len(state.followers.get(user_id, ())),
+            "following_count": len(state.following.get(user_id, ())),
+            "last_post_at": state.last_post_at(user_id),
+        }
+        for user_id in sorted(existing)
+    ]
+    if rows:
+        db.execute(update(models.UserStats), rows)
+    db.commit()
+    return len(rows)
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.eventlog")
+    parser.add_argument("--dir", default=settings.event_log_dir, help="segment directory (EVENT_LOG_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cat = commands.add_parser("cat", help="print records in timestamp order")
+    cat.add_argument("--entity", choices=["post", "comment", "user", "attachment", "notification"])
+    run = commands.add_parser("replay", help="rebuild counters and timelines from the log")
+    run.add_argument("--user", type=int, help="print this user's counters and timeline")
+    run.add_argument("--limit", type=int, default=20)
+    run.add_argument("--apply", action="store_true", help="write the rebuilt counters into user_stats")
+    args = parser.parse_args()
+
+    if not args.dir or not os.path.isdir(args.dir):
+        parser.error(f"no event log directory: {args.dir!r}")
+
+    if args.command == "cat":
+        for record in read_records(args.dir):
+            if args.entity is None or record["entity"] == args.entity:
+                sys.stdout.write(json.dumps(record, separators=(",", ":")) + "\n")
+        return
+
+    state = replay(read_records(args.dir))
+    print(
+        f"{len(state.users)} users created, {len(state.posts)} posts, "
+        f"{sum(map(len, state.likes.values()))} likes, {sum(map(len, state.followers.values()))} follows"
+    )
+    if args.user is not None:
+        print(
+            f"user {args.user}: {len(state.posts_by_owner.get(args.user, ()))} posts, "
+            f"{len(state.followers.get(args.user, ()))} followers, "
+            f"{len(state.following.get(args.user, ()))} following"
+        )
+        for post_id in state.timeline(args.user, args.limit):
+            owner_id, ts = state.posts[post_id]
+            print(
+                f"  post {post_id} by user {owner_id} at {datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()}: "
+                f"{len(state.likes.get(post_id, ()))} likes, {len(state.comments.get(post_id, ()))} comments"
+            )
+    if args.apply:
+        from .database import SessionLocal, get_engine
+
+        get_engine()
+        with SessionLocal() as db:
+            written = apply_stats(db, state)
+        print(f"rewrote user_stats of {written} users created within the log")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,4 +17,7 @@ def raise_unauthorized_exception(detail: str = "Incorrect username or password")
     )
 
 def raise_conflict_exception(detail: str = "Conflict occurred"):
-    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+def raise_payload_too_large_exception(detail: str = "Payload too large"):
+    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
@@ -0,0 +1,225 @@
+"""
+Entity-changed events shared between worker processes.
+
+Write handlers `stage()` an event on their session before committing; it is
+published once the commit succeeds and dropped on rollback. Per-worker state
+(caches, the trending index, ...) listens through `subscribe()` and evicts or
+updates exactly the entities that changed. `LocalBus` covers a single process;
+`SQLiteBus` lets every uvicorn worker on one machine see each other's events
+through a table in a shared SQLite file.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    entity: str          # "post", "comment", "user", "attachment", "notification"
+    entity_id: int
+    action: str = "changed"
+    data: dict = field(default_factory=dict)
+    origin: str = ""     # bus that published it; equal to bus.origin for our own writes
+    seq: int = 0
+
+
+Subscriber = Callable[[Event], None]
+
+
+class InvalidationBus(ABC):
+    def __init__(self):
+        self.origin = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._subscribers: list[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber) -> Subscriber:
+        self._subscribers.append(callback)
+        return callback
+
+    @abstractmethod
+    def publish(self, entity: str, entity_id: int, action: str = "changed", **data):
+        """Record the event for other workers and dispatch it to our own subscribers."""
+
+    def is_local(self, event: Event) -> bool:
+        return event.origin == self.origin
+
+    def _dispatch(self, event: Event):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Invalidation subscriber %r failed on %r", callback, event)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class LocalBus(InvalidationBus):
+    """In-process only; the default when a single worker serves all traffic."""
+
+    def __init__(self):
+        super().__init__()
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, entity: str, entity_id: int, action: str = "changed", **data):
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        self._dispatch(Event(entity, entity_id, action, data, self.origin, seq))
+
+
+class SQLiteBus(InvalidationBus):
+    """
+    Pub/sub over an append-only table in a SQLite file shared by all workers.
+
+    Own events are dispatched synchronously on publish so a worker always sees
+    its own writes; a background thread polls for rows from other workers.
+    """
+
+    def __init__(self, path: str, poll_seconds: float = 0.2, retention_seconds: float = 3600):
+        super().__init__()
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._last_seq = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS invalidation_events ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " entity TEXT NOT NULL, entity_id INTEGER NOT NULL, action TEXT NOT NULL,"
+                " data TEXT NOT NULL, origin TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, entity: str, entity_id: int, action: str = "changed", **data):
+        cursor = self._connect().execute(
+            "INSERT INTO invalidation_events (entity, entity_id, action, data, origin, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (entity, entity_id, action, json.dumps(data), self.origin, time.time()),
+        )
+        self._dispatch(Event(entity, entity_id, action, data, self.origin, cursor.lastrowid))
+
+    def poll(self):
+        rows = self._connect().execute(
+            "SELECT seq, entity, entity_id, action, data, origin FROM invalidation_events"
+            " WHERE seq > ? ORDER BY seq",
+            (self._last_seq,),
+        ).fetchall()
+        for seq, entity, entity_id, action, data, origin in rows:
+            self._last_seq = seq
+            if origin != self.origin:
+                self._dispatch(Event(entity, entity_id, action, json.loads(data), origin, seq))
+
+    def _prune(self):
+        self._connect().execute(
+            "DELETE FROM invalidation_events WHERE created_at < ?",
+            (time.time() - self.retention_seconds,),
+        )
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll()
+                if time.monotonic() - last_prune > 60:
+                    self._prune()
+                    last_prune = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("Polling %s failed", self.path)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        # Only events published from now on matter to a freshly started worker
+        (self._last_seq,) = self._connect().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM invalidation_events"
+        ).fetchone()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+
+@lru_cache
+def get_bus() -> InvalidationBus:
+    """Bus selected by INVALIDATION_BUS_URL: empty/"local", or "sqlite:///path/to/bus.db"."""
+    settings = get_settings()
+    url = settings.invalidation_bus_url
+    if not url or url == "local":
+        return LocalBus()
+    if url.startswith("sqlite:///"):
+        return SQLiteBus(url[len("sqlite:///"):], poll_seconds=settings.invalidation_poll_seconds)
+    raise ValueError(f"Unsupported INVALIDATION_BUS_URL: {url}")
+
+
+def publish(entity: str, entity_id: int, action: str = "changed", **data):
+    get_bus().publish(entity, entity_id, action, **data)
+
+
+def subscribe(callback: Subscriber) -> Subscriber:
+    return get_bus().subscribe(callback)
+
+
+def stage(db: Session, entity: str, entity_id: int, action: str = "changed", **data):
+    """
+    Publish the event once `db` commits. Until then it is visible to
+    `before_commit` listeners through `staged(db)`, so state that must change
+    with the write (version counters) commits in the same transaction.
+    """
+    if not db.in_transaction():
+        db.begin()  # so that a rollback, which drops the event, applies to it
+    db.info.setdefault("staged_events", []).append(Event(entity, entity_id, action, data))
+
+
+def staged(db: Session) -> list[Event]:
+    return db.info.get("staged_events", [])
+
+
+@sa_event.listens_for(SessionLocal, "after_commit")
+def _publish_staged(session):
+    for event in session.info.pop("staged_events", ()):
+        publish(event.entity, event.entity_id, event.action, **event.data)
+
+
+@sa_event.listens_for(SessionLocal, "after_soft_rollback")
+def _drop_staged(session, previous_transaction):
+    if previous_transaction.parent is None:  # a savepoint rollback keeps the outer writes
+        session.info.pop("staged_events", None)
@@ -0,0 +1,121 @@
+"""
+Broadcast hub for live updates.
+
+Entity events from the invalidation bus (ours and other workers') are turned
+into small deltas and fanned out to topic subscribers:
+
+    post:{id}   likes and comments on a post the client has on screen
+    user:{id}   new posts by a user, used to build a client's feed
+
+Each subscriber owns a bounded queue; one that falls behind is dropped rather
+than slowing down publishers.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from . import invalidation
+from .config import get_settings
+
+
+class Subscription:
+    def __init__(self, topics: set[str], queue_size: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    async def get(self, timeout: float) -> dict | None:
+        """Next message, or None on timeout. Raises ConnectionError once dropped."""
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            message = None
+        if self.dropped:
+            raise ConnectionError("subscriber fell behind and was dropped")
+        return message
+
+
+class BroadcastHub:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, topics: set[str]) -> Subscription:
+        """Must be called from the event loop that will consume the queue."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(topics, self.queue_size)
+        with self._lock:
+            for topic in topics:
+                self._topics[topic].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def publish(self, topic: str, message: dict):
+        """Thread-safe; a no-op when nobody listens to `topic`."""
+        if self._loop is None or topic not in self._topics:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(topic, message)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver, topic, message)
+
+    def _deliver(self, topic: str, message: dict):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription):
+        self.unsubscribe(subscription)
+        subscription.dropped = True
+        # Make room for a wake-up so the consumer notices right away
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    def on_event(self, event: invalidation.Event):
+        data = event.data
+        if event.entity == "post":
+            if event.action == "created":
+                self.publish(f"user:{data['owner_id']}", {"type": "post_created", "post_id": event.entity_id})
+            elif event.action == "deleted":
+                self.publish(f"post:{event.entity_id}", {"type": "post_deleted", "post_id": event.entity_id})
+            elif event.action in ("liked", "unliked"):
+                self.publish(f"post:{event.entity_id}", {
+                    "type": "like",
+                    "post_id": event.entity_id,
+                    "user_id": data.get("user_id"),
+                    "delta": 1 if event.action == "liked" else -1,
+                })
+        elif event.entity == "comment" and event.action in ("created", "deleted", "updated"):
+            self.publish(f"post:{data['post_id']}", {
+                "type": f"comment_{event.action}",
+                "post_id": data["post_id"],
+                "comment_id": event.entity_id,
+                "user_id": data.get("owner_id"),
+            })
+
+
+@lru_cache
+def get_hub() -> BroadcastHub:
+    hub = BroadcastHub(queue_size=get_settings().live_queue_size)
+    invalidation.subscribe(hub.on_event)
+    return hub
@@ -1,38 +1,131 @@
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import Engine
 
 # Local imports
-from .database import engine
-from .models import Base
-from .routes import users, posts, comments
+from .config import Settings, get_settings, install_settings
+from .database import get_engine, install_engine
+from .compression import CompressionMiddleware
+from .eventlog import get_writer
+from .invalidation import get_bus
+from .live import get_hub
+from .notifications import get_worker
+from .trending import get_index
+from . import media
+from .routes import users, posts, comments, live, tags, notifications
+from .routes import media as media_routes
 from .auth import router as auth_router
 
-# Initialize FastAPI app
-app = FastAPI(
-    title="We Connect API",
-    description="Social media API for We Connect platform",
-    version="1.0.0"
-)
-
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For production: specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Root endpoint
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the API"}
-
-# Register routers
-app.include_router(auth_router)
-app.include_router(users.router)
-app.include_router(posts.router)
-app.include_router(comments.router)
\ No newline at end of file
+
+_active: FastAPI | None = None
+_active_lock = threading.Lock()
+
+
+def activate(app: FastAPI):
+    """
+    Make `app`'s settings and engine the process-wide ones. The bus, caches and
+    background workers are per process, so only one configured app can serve
+    at a time; activating another raises instead of repointing the first.
+    Called on startup, and by app.testing, which runs apps without a lifespan.
+    """
+    global _active
+    with _active_lock:
+        if _active is app:
+            return
+        if _active is not None:
+            raise RuntimeError("Another app is active in this process; deactivate() it first")
+        if app.state.settings is not None:
+            install_settings(app.state.settings)
+        if app.state.engine is not None:
+            install_engine(app.state.engine)
+        _active = app
+
+
+def deactivate(app: FastAPI):
+    global _active
+    with _active_lock:
+        if _active is not app:
+            return
+        if app.state.settings is not None:
+            install_settings(None)
+        if app.state.engine is not None:
+            install_engine(None)
+        _active = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nothing above touches the environment or the database; do it once per worker here
+    activate(app)
+    settings = get_settings()
+    engine = get_engine()
+    # Database schema is managed by migrations: `python -m app.migrations upgrade`
+    if settings.auto_migrate:
+        from . import migrations
+
+        migrations.upgrade(engine)
+    bus = get_bus()
+    get_hub()
+    notification_worker = get_worker()
+    trending_index = get_index()
+    event_log = get_writer()
+    bus.start()
+    yield
+    bus.stop()
+    notification_worker.stop()
+    trending_index.stop()
+    if event_log is not None:
+        event_log.stop()
+    media.shutdown()
+    if app.state.engine is None:
+        engine.dispose()  # an injected engine belongs to the caller
+    deactivate(app)
+
+
+def create_app(settings: Settings | None = None, engine: Engine | None = None) -> FastAPI:
+    """
+    Build the API. `settings` and `engine` replace the environment and
+    DATABASE_URL once the app is activated (on startup); building an app
+    changes nothing, and without them nothing is read until startup.
+    """
+    app = FastAPI(
+        title="We Connect API",
+        description="Social media API for We Connect platform",
+        version="1.0.0",
+        lifespan=lifespan,
+    )
+    app.state.settings = settings
+    app.state.engine = engine
+
+    # Configure CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # For production: specify exact origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["ETag"],
+    )
+    app.add_middleware(CompressionMiddleware)
+
+    # Root endpoint
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the API"}
+
+    # Register routers
+    app.include_router(auth_router)
+    app.include_router(users.router)
+    app.include_router(posts.router)
+    app.include_router(comments.router)
+    app.include_router(live.router)
+    app.include_router(media_routes.router)
+    app.include_router(tags.router)
+    app.include_router(notifications.router)
+    return app
+
+
+app = create_app()
@@ -0,0 +1,202 @@
+"""
+Content-addressed storage for post attachments.
+
+Uploads are parsed straight off the request stream: each multipart chunk is
+hashed and appended to a temp file, so a worker never holds more than one
+chunk of an upload in memory. The finished file is renamed to its SHA-256, so
+identical files are stored once. Thumbnails are rendered by Pillow (listed in
+requirements.txt) in a process pool; if it is not importable, none are
+rendered and the thumbnail route serves the original.
+"""
+import hashlib
+import importlib.util
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+
+from anyio import to_thread
+from fastapi import Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .config import get_settings
+from .exceptions import raise_bad_request_exception
+
+# Magic numbers of the image formats we accept; the declared part type is not trusted
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredFile:
+    sha256: str
+    size: int
+    content_type: str
+
+
+def _sniff(head: bytes) -> str | None:
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def blob_path(sha256: str) -> str:
+    root = get_settings().media_root
+    return os.path.join(root, sha256[:2], sha256[2:4], sha256)
+
+
+def thumbnail_path(sha256: str) -> str:
+    return blob_path(sha256) + ".thumb.jpg"
+
+
+class _FilePartWriter:
+    """MultipartParser callbacks that stream the `file` field into a temp file."""
+
+    def __init__(self, tmp_path: str, max_bytes: int):
+        self.tmp_path = tmp_path
+        self.max_bytes = max_bytes
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.found = False
+        self._file = None
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: dict[bytes, bytes] = {}
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: self._append("_header_field", data[start:end]),
+            "on_header_value": lambda data, start, end: self._append("_header_value", data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _append(self, attr: str, chunk: bytes):
+        setattr(self, attr, getattr(self, attr) + chunk)
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if options.get(b"name") == b"file" and b"filename" in options and not self.found:
+            self.found = True
+            self._file = open(self.tmp_path, "wb")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._file is None:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge()
+        if len(self.head) < 16:
+            self.head += chunk[: 16 - len(self.head)]
+        self.hasher.update(chunk)
+        self._file.write(chunk)
+
+    def _on_part_end(self):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+async def store_upload(request: Request) -> StoredFile:
+    """Stream the multipart `file` field of `request` into storage."""
+    settings = get_settings()
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise_bad_request_exception("Expected a multipart/form-data upload")
+
+    tmp_dir = os.path.join(settings.media_root, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    writer = _FilePartWriter(tmp_path, settings.media_max_bytes)
+    parser = MultipartParser(options[b"boundary"], writer.callbacks())
+
+    try:
+        async for chunk in request.stream():
+            # Hashing and disk writes happen off the event loop
+            await to_thread.run_sync(parser.write, chunk)
+        await to_thread.run_sync(parser.finalize)
+    except BaseException:
+        writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    writer.close()
+
+    if not writer.found:
+        raise_bad_request_exception("Missing file field")
+    detected = _sniff(writer.head)
+    if detected is None:
+        os.remove(tmp_path)
+        raise_bad_request_exception("Only JPEG, PNG, GIF and WebP images are supported")
+
+    sha256 = writer.hasher.hexdigest()
+    final_path = blob_path(sha256)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)  # ✅ Already stored once
+    else:
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)
+        schedule_thumbnail(sha256)
+    return StoredFile(sha256=sha256, size=writer.size, content_type=detected)
+
+
+# -------------------- Thumbnails --------------------
+
+def _render_thumbnail(source: str, target: str, size: int) -> bool:
+    # Runs in a worker process
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        tmp_target = f"{target}.{os.getpid()}.tmp"
+        image.convert("RGB").save(tmp_target, "JPEG", quality=80)
+    os.replace(tmp_target, target)
+    return True
+
+
+@lru_cache
+def _thumbnail_pool() -> ProcessPoolExecutor | None:
+    if importlib.util.find_spec("PIL") is None:
+        return None
+    return ProcessPoolExecutor(max_workers=get_settings().media_thumbnail_workers)
+
+
+def schedule_thumbnail(sha256: str):
+    pool = _thumbnail_pool()
+    if pool is not None:
+        pool.submit(_render_thumbnail, blob_path(sha256), thumbnail_path(sha256), get_settings().media_thumbnail_size)
+
+
+def shutdown():
+    if _thumbnail_pool.cache_info().currsize:
+        pool = _thumbnail_pool()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        _thumbnail_pool.cache_clear()
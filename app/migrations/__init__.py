@@ -0,0 +1,122 @@
+"""
+Versioned schema migrations.
+
+Each module in `app/migrations/versions` is one revision exposing `revision`,
+`down_revision`, `upgrade(connection)` and `downgrade(connection)`. Applied
+revisions are recorded in the `schema_migrations` table. Run them with:
+
+    python -m app.migrations upgrade
+"""
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect
+from sqlalchemy.engine import Connection, Engine
+
+from . import versions
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("revision", String(64), primary_key=True),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+
+def create_index_if_missing(connection: Connection, index):
+    index.create(connection, checkfirst=True)
+
+
+def drop_index_if_present(connection: Connection, index):
+    index.drop(connection, checkfirst=True)
+
+
+def add_column_if_missing(connection: Connection, table: Table, column_name: str):
+    """ALTER TABLE ... ADD COLUMN using the column as declared on `table`."""
+    existing = {column["name"] for column in inspect(connection).get_columns(table.name)}
+    if column_name in existing:
+        return
+    column = table.c[column_name]
+    ddl = f"{column.type.compile(connection.dialect)}"
+    if column.server_default is not None:
+        ddl += f" DEFAULT {column.server_default.arg}"
+    if not column.nullable:
+        ddl += " NOT NULL"
+    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {ddl}")
+
+
+def load_revisions() -> list:
+    """Return the revision modules ordered from base to head."""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    by_parent = {module.down_revision: module for module in modules}
+    if len(by_parent) != len(modules):
+        raise RuntimeError("Migration history has branches; every down_revision must be unique")
+
+    ordered, parent = [], None
+    while parent in by_parent:
+        module = by_parent[parent]
+        ordered.append(module)
+        parent = module.revision
+    if len(ordered) != len(modules):
+        raise RuntimeError("Migration history is not a single chain starting at down_revision=None")
+    return ordered
+
+
+def applied_revisions(connection: Connection) -> list[str]:
+    if not inspect(connection).has_table(schema_migrations.name):
+        return []
+    rows = connection.execute(schema_migrations.select().order_by(schema_migrations.c.applied_at))
+    return [row.revision for row in rows]
+
+
+def current(engine: Engine) -> str | None:
+    with engine.connect() as connection:
+        applied = set(applied_revisions(connection))
+    head = None
+    for module in load_revisions():
+        if module.revision in applied:
+            head = module.revision
+    return head
+
+
+def upgrade(engine: Engine, target: str | None = None) -> list[str]:
+    """Apply pending revisions up to `target` (default: head). Returns what ran."""
+    ran = []
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+    for module in load_revisions():
+        with engine.begin() as connection:
+            if module.revision not in applied_revisions(connection):
+                module.upgrade(connection)
+                connection.execute(
+                    schema_migrations.insert().values(
+                        revision=module.revision,
+                        applied_at=datetime.now(timezone.utc),
+                    )
+                )
+                ran.append(module.revision)
+        if module.revision == target:
+            break
+    return ran
+
+
+def downgrade(engine: Engine, target: str | None = None) -> list[str]:
+    """Revert applied revisions newer than `target` (default: all of them)."""
+    ran = []
+    for module in reversed(load_revisions()):
+        if module.revision == target:
+            break
+        with engine.begin() as connection:
+            if module.revision in applied_revisions(connection):
+                module.downgrade(connection)
+                connection.execute(
+                    schema_migrations.delete().where(schema_migrations.c.revision == module.revision)
+                )
+                ran.append(module.revision)
+    return ran
@@ -0,0 +1,33 @@
+import argparse
+
+from ..database import get_engine
+from . import current, downgrade, load_revisions, upgrade
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    up = commands.add_parser("upgrade", help="apply pending revisions")
+    up.add_argument("target", nargs="?", help="stop after this revision (default: head)")
+    down = commands.add_parser("downgrade", help="revert applied revisions")
+    down.add_argument("target", nargs="?", help="revert down to (not including) this revision")
+    commands.add_parser("current", help="show the latest applied revision")
+    commands.add_parser("history", help="list all revisions")
+    args = parser.parse_args()
+    engine = get_engine()
+
+    if args.command == "upgrade":
+        ran = upgrade(engine, args.target)
+        print("\n".join(f"applied {revision}" for revision in ran) or "already up to date")
+    elif args.command == "downgrade":
+        ran = downgrade(engine, args.target)
+        print("\n".join(f"reverted {revision}" for revision in ran) or "nothing to revert")
+    elif args.command == "current":
+        print(current(engine) or "<base>")
+    else:
+        for module in load_revisions():
+            print(f"{module.revision}: {module.__doc__.strip().splitlines()[0] if module.__doc__ else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Initial schema: users, follows, posts, likes, retweets, comments, post_scores.
+
+Uses checkfirst, so databases created by the old import-time create_all()
+are adopted as-is.
+"""
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+
+revision = "0001_initial"
+down_revision = None
+
+# Frozen copy of the tables as of this revision; later revisions add to them
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, index=True, nullable=False),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "follows",
+    metadata,
+    Column("follower_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+    Column("followee_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+)
+
+Table(
+    "posts",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("title", String(255), nullable=False),
+    Column("content", String(280), nullable=False),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+)
+
+Table(
+    "likes",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True, nullable=False, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True, nullable=False, index=True),
+)
+
+Table(
+    "retweets",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True, nullable=False, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True, nullable=False, index=True),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "comments",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("content", String(500), nullable=False),
+    Column("timestamp", DateTime(timezone=True), server_default=func.now()),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=False, index=True),
+)
+
+Table(
+    "post_scores",
+    metadata,
+    Column("post_id", Integer, ForeignKey("posts.id"), primary_key=True),
+    Column("score", Float, nullable=False, default=0.0, index=True),
+    Column("updated_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection)
+
+
+def downgrade(connection):
+    metadata.drop_all(connection)
@@ -0,0 +1,33 @@
+"""Composite indexes for the timeline, profile, comment and follow query shapes."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, Table
+
+from .. import create_index_if_missing, drop_index_if_present
+
+revision = "0002_performance_indexes"
+down_revision = "0001_initial"
+
+# Frozen copy of the indexed columns as of this revision
+metadata = MetaData()
+
+posts = Table("posts", metadata, Column("owner_id", Integer), Column("timestamp", DateTime(timezone=True)))
+comments = Table("comments", metadata, Column("post_id", Integer), Column("timestamp", DateTime(timezone=True)))
+follows = Table("follows", metadata, Column("follower_id", Integer), Column("followee_id", Integer))
+likes = Table("likes", metadata, Column("user_id", Integer), Column("post_id", Integer))
+
+INDEXES = [
+    Index("ix_posts_timestamp", posts.c.timestamp),
+    Index("ix_posts_owner_id_timestamp", posts.c.owner_id, posts.c.timestamp.desc()),
+    Index("ix_comments_post_id_timestamp", comments.c.post_id, comments.c.timestamp),
+    Index("ix_follows_followee_id_follower_id", follows.c.followee_id, follows.c.follower_id),
+    Index("ix_likes_post_id_user_id", likes.c.post_id, likes.c.user_id),
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index_if_missing(connection, index)
+
+
+def downgrade(connection):
+    for index in INDEXES:
+        drop_index_if_present(connection, index)
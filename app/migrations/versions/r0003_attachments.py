@@ -0,0 +1,32 @@
+"""Attachments table for media uploaded to content-addressed storage."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+
+revision = "0003_attachments"
+down_revision = "0002_performance_indexes"
+
+# Frozen copy of the table as of this revision; users and posts only as FK targets
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+Table("posts", metadata, Column("id", Integer, primary_key=True))
+
+attachments = Table(
+    "attachments",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sha256", String(64), nullable=False, index=True),
+    Column("content_type", String(100), nullable=False),
+    Column("size", Integer, nullable=False),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=True, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+def upgrade(connection):
+    attachments.create(connection, checkfirst=True)
+
+
+def downgrade(connection):
+    attachments.drop(connection, checkfirst=True)
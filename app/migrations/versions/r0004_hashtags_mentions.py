@@ -0,0 +1,46 @@
+"""Hashtag and mention index tables.
+
+Run `python -m app.tags backfill` afterwards to index existing posts and comments.
+"""
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, String, Table
+
+revision = "0004_hashtags_mentions"
+down_revision = "0003_attachments"
+
+# Frozen copy of the tables as of this revision; users, posts and comments only as FK targets
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+Table("posts", metadata, Column("id", Integer, primary_key=True))
+Table("comments", metadata, Column("id", Integer, primary_key=True))
+
+hashtags = Table(
+    "hashtags",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("tag", String(50), nullable=False),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=False, index=True),
+    Column("comment_id", Integer, ForeignKey("comments.id"), nullable=True, index=True),
+    Index("ix_hashtags_tag_id", "tag", "id"),
+)
+
+mentions = Table(
+    "mentions",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("author_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("post_id", Integer, ForeignKey("posts.id"), nullable=False, index=True),
+    Column("comment_id", Integer, ForeignKey("comments.id"), nullable=True, index=True),
+    Index("ix_mentions_user_id_id", "user_id", "id"),
+)
+
+TABLES = [hashtags, mentions]
+
+
+def upgrade(connection):
+    metadata.create_all(connection, tables=TABLES)
+
+
+def downgrade(connection):
+    metadata.drop_all(connection, tables=TABLES)
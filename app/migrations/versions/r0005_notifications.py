@@ -0,0 +1,56 @@
+"""Aggregated notifications and the users.unread_notifications counter."""
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+)
+from sqlalchemy.sql import false
+
+from .. import add_column_if_missing
+
+revision = "0005_notifications"
+down_revision = "0004_hashtags_mentions"
+
+# Frozen copy of the table and column as of this revision
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("unread_notifications", Integer, nullable=False, default=0, server_default="0"),
+)
+
+notifications = Table(
+    "notifications",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("recipient_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("type", String(20), nullable=False),
+    Column("target_id", Integer, nullable=False),
+    Column("bucket_start", DateTime(timezone=True), nullable=False),
+    Column("count", Integer, nullable=False, default=1),
+    Column("last_actor_id", Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+    Column("read", Boolean, nullable=False, default=False, server_default=false()),
+    UniqueConstraint("recipient_id", "type", "target_id", "bucket_start", name="uq_notifications_bucket"),
+)
+Index("ix_notifications_recipient_id_updated_at", notifications.c.recipient_id, notifications.c.updated_at.desc())
+Index("ix_notifications_recipient_id_read", notifications.c.recipient_id, notifications.c.read)
+
+
+def upgrade(connection):
+    notifications.create(connection, checkfirst=True)
+    add_column_if_missing(connection, users, "unread_notifications")
+
+
+def downgrade(connection):
+    notifications.drop(connection, checkfirst=True)
+    connection.exec_driver_sql("ALTER TABLE users DROP COLUMN unread_notifications")
@@ -0,0 +1,41 @@
+"""Materialized per-user counters, backfilled from posts and follows."""
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, Table
+
+revision = "0006_user_stats"
+down_revision = "0005_notifications"
+
+# Frozen copy of the table and the schema the backfill reads, as of this revision;
+# app.stats moves on with later ones
+metadata = MetaData()
+
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+user_stats = Table(
+    "user_stats",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("post_count", Integer, nullable=False, default=0, server_default="0"),
+    Column("follower_count", Integer, nullable=False, default=0, server_default="0"),
+    Column("following_count", Integer, nullable=False, default=0, server_default="0"),
+    Column("last_post_at", DateTime(timezone=True), nullable=True),
+)
+
+BACKFILL = """
+INSERT INTO user_stats (user_id, post_count, follower_count, following_count, last_post_at)
+SELECT users.id,
+       (SELECT count(*) FROM posts WHERE posts.owner_id = users.id),
+       (SELECT count(*) FROM follows WHERE follows.followee_id = users.id),
+       (SELECT count(*) FROM follows WHERE follows.follower_id = users.id),
+       (SELECT max(posts.timestamp) FROM posts WHERE posts.owner_id = users.id)
+FROM users
+WHERE NOT EXISTS (SELECT 1 FROM user_stats WHERE user_stats.user_id = users.id)
+"""
+
+
+def upgrade(connection):
+    user_stats.create(connection, checkfirst=True)
+    connection.exec_driver_sql(BACKFILL)
+
+
+def downgrade(connection):
+    user_stats.drop(connection, checkfirst=True)
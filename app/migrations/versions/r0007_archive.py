@@ -0,0 +1,62 @@
+"""Soft-delete columns on posts and comments, and the archive tables."""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from sqlalchemy.sql import func
+
+from .. import add_column_if_missing
+
+revision = "0007_archive"
+down_revision = "0006_user_stats"
+
+# Frozen copy of the columns and tables as of this revision
+metadata = MetaData()
+
+posts = Table("posts", metadata, Column("deleted_at", DateTime(timezone=True), nullable=True))
+comments = Table("comments", metadata, Column("deleted_at", DateTime(timezone=True), nullable=True))
+
+posts_archive = Table(
+    "posts_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("title", String(255), nullable=False),
+    Column("content", String(280), nullable=False),
+    Column("timestamp", DateTime(timezone=True), nullable=False),
+    Column("owner_id", Integer, nullable=False),
+    Column("attachment_ids", String(255), nullable=False, default=""),
+    Column("archived_at", DateTime(timezone=True), server_default=func.now()),
+    Index("ix_posts_archive_owner_id_timestamp", "owner_id", "timestamp"),
+)
+
+comments_archive = Table(
+    "comments_archive",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=False),
+    Column("content", String(500), nullable=False),
+    Column("timestamp", DateTime(timezone=True), nullable=False),
+    Column("owner_id", Integer, nullable=False, index=True),
+    Column("post_id", Integer, nullable=False),
+    Index("ix_comments_archive_post_id_timestamp", "post_id", "timestamp"),
+)
+
+likes_archive = Table(
+    "likes_archive",
+    metadata,
+    Column("user_id", Integer, primary_key=True),
+    Column("post_id", Integer, primary_key=True),
+    Index("ix_likes_archive_post_id_user_id", "post_id", "user_id"),
+)
+
+ARCHIVE_TABLES = [posts_archive, comments_archive, likes_archive]
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, posts, "deleted_at")
+    add_column_if_missing(connection, comments, "deleted_at")
+    for table in ARCHIVE_TABLES:
+        table.create(connection, checkfirst=True)
+
+
+def downgrade(connection):
+    for table in reversed(ARCHIVE_TABLES):
+        table.drop(connection, checkfirst=True)
+    connection.exec_driver_sql("ALTER TABLE comments DROP COLUMN deleted_at")
+    connection.exec_driver_sql("ALTER TABLE posts DROP COLUMN deleted_at")
@@ -0,0 +1,23 @@
+"""Shared version counters behind the list endpoints' ETags."""
+from sqlalchemy import Column, Integer, MetaData, String, Table
+
+revision = "0008_resource_versions"
+down_revision = "0007_archive"
+
+# Frozen copy of the table as of this revision
+metadata = MetaData()
+
+resource_versions = Table(
+    "resource_versions",
+    metadata,
+    Column("name", String(100), primary_key=True),
+    Column("version", Integer, nullable=False, default=0),
+)
+
+
+def upgrade(connection):
+    resource_versions.create(connection, checkfirst=True)
+
+
+def downgrade(connection):
+    resource_versions.drop(connection, checkfirst=True)
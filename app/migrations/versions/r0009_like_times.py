@@ -0,0 +1,19 @@
+"""likes.created_at, so an unlike takes back exactly what its like added to trending."""
+from sqlalchemy import Column, DateTime, MetaData, Table
+
+from .. import add_column_if_missing
+
+revision = "0009_like_times"
+down_revision = "0008_resource_versions"
+
+metadata = MetaData()
+
+likes = Table("likes", metadata, Column("created_at", DateTime(timezone=True)))
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, likes, "created_at")
+
+
+def downgrade(connection):
+    connection.exec_driver_sql("ALTER TABLE likes DROP COLUMN created_at")
@@ -1,13 +1,17 @@
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
     String,
     DateTime,
+    Float,
     ForeignKey,
+    Index,
     Table,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func
 from .database import Base
 
 # Association table for follower-followee relationships
@@ -16,6 +20,8 @@ Follow = Table(
     Base.metadata,
     Column("follower_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
     Column("followee_id", Integer, ForeignKey("users.id"), primary_key=True, index=True),
+    # Followers-of lookups filter on followee_id and only need follower_id
+    Index("ix_follows_followee_id_follower_id", "followee_id", "follower_id"),
 )
 
 
@@ -27,6 +33,8 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Maintained by app.notifications so the badge never needs COUNT(*)
+    unread_notifications = Column(Integer, nullable=False, default=0, server_default="0")
 
     posts = relationship(
         "Post",
@@ -38,6 +46,29 @@ class User(Base):
         back_populates="owner",
         cascade="all, delete-orphan"
     )
+    attachments = relationship(
+        "Attachment",
+        back_populates="owner",
+        cascade="all, delete-orphan"
+    )
+    mentions = relationship(
+        "Mention",
+        foreign_keys="Mention.user_id",
+        back_populates="user",
+        cascade="all, delete-orphan"
+    )
+    notifications = relationship(
+        "Notification",
+        foreign_keys="Notification.recipient_id",
+        back_populates="recipient",
+        cascade="all, delete-orphan"
+    )
+    stats = relationship(
+        "UserStats",
+        back_populates="user",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
 
     followers = relationship(
         "User",
@@ -67,6 +98,13 @@ class Post(Base):
     content = Column(String(280), nullable=False)
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Soft delete: set instead of removing the row; app.archive purges it later
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_posts_timestamp", timestamp),
+        Index("ix_posts_owner_id_timestamp", owner_id, timestamp.desc()),
+    )
 
     owner = relationship("User", back_populates="posts")
     likes = relationship(
@@ -84,6 +122,24 @@ class Post(Base):
         back_populates="post",
         cascade="all, delete-orphan"
     )
+    attachments = relationship(
+        "Attachment",
+        back_populates="post",
+        order_by="Attachment.id",
+    )
+    score = relationship(
+        "PostScore",
+        back_populates="post",
+        uselist=False,
+        cascade="all, delete-orphan"
+    )
+    hashtags = relationship("Hashtag", back_populates="post", cascade="all, delete-orphan")
+    mentions = relationship(
+        "Mention",
+        foreign_keys="Mention.post_id",
+        back_populates="post",
+        cascade="all, delete-orphan"
+    )
 
     def __repr__(self):
         return f"<Post(id={self.id}, title={self.title}, owner_id={self.owner_id})>"
@@ -94,6 +150,14 @@ class Like(Base):
 
     user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, nullable=False, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True, nullable=False, index=True)
+    # Unliking takes back the trending contribution made at this time; NULL for
+    # likes made before it was recorded
+    created_at = Column(DateTime(timezone=True), default=func.now())
+
+    __table_args__ = (
+        # Covers both the per-post like count and the "liked by me" probe
+        Index("ix_likes_post_id_user_id", post_id, user_id),
+    )
 
     user = relationship("User")
     post = relationship("Post", back_populates="likes")
@@ -124,9 +188,200 @@ class Comment(Base):
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_comments_post_id_timestamp", post_id, timestamp),
+    )
 
     owner = relationship("User", back_populates="comments")  # ✅ Important: Allows access to comment.owner.username
     post = relationship("Post", back_populates="comments")
+    hashtags = relationship("Hashtag", cascade="all, delete-orphan")
+    mentions = relationship("Mention", foreign_keys="Mention.comment_id", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Comment(id={self.id}, owner_id={self.owner_id}, post_id={self.post_id})>"
+
+
+class PostScore(Base):
+    __tablename__ = "post_scores"
+
+    # Decayed trending score as of updated_at, persisted by app.trending
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    score = Column(Float, nullable=False, default=0.0, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    post = relationship("Post", back_populates="score")
+
+    def __repr__(self):
+        return f"<PostScore(post_id={self.post_id}, score={self.score})>"
+
+
+class Attachment(Base):
+    __tablename__ = "attachments"
+
+    # Files live in content-addressed storage (app.media); rows sharing a sha256 share one file
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, index=True)
+    content_type = Column(String(100), nullable=False)
+    size = Column(Integer, nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    owner = relationship("User", back_populates="attachments")
+    post = relationship("Post", back_populates="attachments")
+
+    def __repr__(self):
+        return f"<Attachment(id={self.id}, sha256={self.sha256[:12]}, post_id={self.post_id})>"
+
+
+class Hashtag(Base):
+    __tablename__ = "hashtags"
+
+    # One row per (tag, post or comment); comment_id is NULL for tags in the post itself
+    id = Column(Integer, primary_key=True)
+    tag = Column(String(50), nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
+    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        # /tags/{tag} pages newest-first by id within one tag
+        Index("ix_hashtags_tag_id", tag, id),
+    )
+
+    post = relationship("Post", back_populates="hashtags")
+
+    def __repr__(self):
+        return f"<Hashtag(tag={self.tag}, post_id={self.post_id}, comment_id={self.comment_id})>"
+
+
+class Mention(Base):
+    __tablename__ = "mentions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
+    comment_id = Column(Integer, ForeignKey("comments.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        # /users/me/mentions pages newest-first by id for one user
+        Index("ix_mentions_user_id_id", user_id, id),
+    )
+
+    user = relationship("User", foreign_keys=[user_id], back_populates="mentions")
+    author = relationship("User", foreign_keys=[author_id])
+    post = relationship("Post", foreign_keys=[post_id], back_populates="mentions")
+
+    def __repr__(self):
+        return f"<Mention(user_id={self.user_id}, post_id={self.post_id}, comment_id={self.comment_id})>"
+
+
+class Notification(Base):
+    __tablename__ = "notifications"
+
+    # One row aggregates every event of a type on a target within a time bucket
+    # ("alice and 41 others liked your post"); see app.notifications
+    id = Column(Integer, primary_key=True)
+    recipient_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    type = Column(String(20), nullable=False)       # "like", "comment", "follow"
+    target_id = Column(Integer, nullable=False)     # post id, or the recipient for follows
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    count = Column(Integer, nullable=False, default=1)
+    last_actor_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    read = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    __table_args__ = (
+        UniqueConstraint("recipient_id", "type", "target_id", "bucket_start", name="uq_notifications_bucket"),
+        Index("ix_notifications_recipient_id_updated_at", recipient_id, updated_at.desc()),
+        Index("ix_notifications_recipient_id_read", recipient_id, read),
+    )
+
+    recipient = relationship("User", foreign_keys=[recipient_id], back_populates="notifications")
+    last_actor = relationship("User", foreign_keys=[last_actor_id])
+
+    def __repr__(self):
+        return f"<Notification(recipient_id={self.recipient_id}, type={self.type}, target_id={self.target_id}, count={self.count})>"
+
+
+class UserStats(Base):
+    __tablename__ = "user_stats"
+
+    # Maintained on writes by app.stats; profile reads never count rows
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_post_at = Column(DateTime(timezone=True), nullable=True)
+
+    user = relationship("User", back_populates="stats")
+
+    def __repr__(self):
+        return f"<UserStats(user_id={self.user_id}, posts={self.post_count}, followers={self.follower_count})>"
+
+
+# -------------------- Archive tier --------------------
+# Cold copies of old posts, written by app.archive. Rows keep their original ids
+# and carry no foreign keys, so moving a batch is plain INSERT ... SELECT.
+
+class PostArchive(Base):
+    __tablename__ = "posts_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(255), nullable=False)
+    content = Column(String(280), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    owner_id = Column(Integer, nullable=False)
+    attachment_ids = Column(String(255), nullable=False, default="")  # comma-separated, detached on archive
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_posts_archive_owner_id_timestamp", owner_id, timestamp),
+    )
+
+    def __repr__(self):
+        return f"<PostArchive(id={self.id}, owner_id={self.owner_id})>"
+
+
+class CommentArchive(Base):
+    __tablename__ = "comments_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    content = Column(String(500), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    owner_id = Column(Integer, nullable=False, index=True)
+    post_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_comments_archive_post_id_timestamp", post_id, timestamp),
+    )
+
+    def __repr__(self):
+        return f"<CommentArchive(id={self.id}, post_id={self.post_id})>"
+
+
+class LikeArchive(Base):
+    __tablename__ = "likes_archive"
+
+    user_id = Column(Integer, primary_key=True)
+    post_id = Column(Integer, primary_key=True)
+
+    __table_args__ = (
+        Index("ix_likes_archive_post_id_user_id", post_id, user_id),
+    )
+
+    def __repr__(self):
+        return f"<LikeArchive(user_id={self.user_id}, post_id={self.post_id})>"
+
+
+class ResourceVersion(Base):
+    __tablename__ = "resource_versions"
+
+    # Bumped after every write that can change the resource; see app.versions
+    name = Column(String(100), primary_key=True)  # "posts", "users", "user:{id}", "comments:{post_id}", "*"
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ResourceVersion(name={self.name}, version={self.version})>"
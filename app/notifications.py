@@ -0,0 +1,135 @@
+"""
+Aggregated notifications, generated off the request path.
+
+Likes, comments and follows published on the invalidation bus by this worker
+are queued to a background thread. It drains the queue in batches, folds
+events with the same (recipient, type, target, time bucket) together and
+upserts one row per key, so a post that gets 40 likes in an hour costs one
+notification row rather than 40. The per-user unread counter is refreshed for
+the touched recipients only, so reading it never needs COUNT(*).
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+from .config import get_settings
+from .database import SessionLocal, get_engine, upsert
+from .workers import BatchWorker
+
+@dataclass(frozen=True)
+class NotificationEvent:
+    recipient_id: int
+    type: str
+    target_id: int
+    actor_id: int
+    at: float
+
+
+def event_from_bus(event: invalidation.Event) -> NotificationEvent | None:
+    data, now = event.data, time.time()
+    if event.entity == "post" and event.action == "liked":
+        return NotificationEvent(data["owner_id"], "like", event.entity_id, data["user_id"], now)
+    if event.entity == "comment" and event.action == "created":
+        return NotificationEvent(data["post_owner_id"], "comment", data["post_id"], data["owner_id"], now)
+    if event.entity == "user" and event.action == "followed":
+        return NotificationEvent(event.entity_id, "follow", event.entity_id, data["follower_id"], now)
+    return None
+
+
+def _upsert(db: Session, rows: list[dict]):
+    table = models.Notification.__table__
+    upsert(
+        db,
+        table,
+        rows,
+        [table.c.recipient_id, table.c.type, table.c.target_id, table.c.bucket_start],
+        lambda new: {
+            "count": table.c.count + new.count,
+            "last_actor_id": new.last_actor_id,
+            "updated_at": new.updated_at,
+            "read": False,
+        },
+    )
+
+
+def refresh_unread_counts(db: Session, recipient_ids: set[int]):
+    unread = (
+        select(func.count(models.Notification.id))
+        .where(
+            models.Notification.recipient_id == models.User.id,
+            models.Notification.read.is_(False),
+        )
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.User)
+        .where(models.User.id.in_(recipient_ids))
+        .values(unread_notifications=unread)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def write_batch(db: Session, events: list[NotificationEvent], bucket_seconds: int):
+    """Fold `events` into one upsert per notification bucket and commit."""
+    folded: dict[tuple, dict] = {}
+    for event in sorted(events, key=lambda e: e.at):
+        bucket = int(event.at // bucket_seconds * bucket_seconds)
+        key = (event.recipient_id, event.type, event.target_id, bucket)
+        row = folded.setdefault(key, {
+            "recipient_id": event.recipient_id,
+            "type": event.type,
+            "target_id": event.target_id,
+            "bucket_start": datetime.fromtimestamp(bucket, tz=timezone.utc),
+            "count": 0,
+            "read": False,
+        })
+        row["count"] += 1
+        row["last_actor_id"] = event.actor_id
+        row["updated_at"] = datetime.fromtimestamp(event.at, tz=timezone.utc)
+
+    if not folded:
+        return
+    _upsert(db, list(folded.values()))
+    refresh_unread_counts(db, {row["recipient_id"] for row in folded.values()})
+    db.commit()
+
+
+class NotificationWorker(BatchWorker):
+    thread_name = "notifications"
+
+    def __init__(
+        self, session_factory, bucket_seconds: int, batch_size: int, flush_seconds: float, background: bool = True
+    ):
+        super().__init__(batch_size, flush_seconds, background)
+        self.session_factory = session_factory
+        self.bucket_seconds = bucket_seconds
+
+    def item_for(self, event: invalidation.Event) -> NotificationEvent | None:
+        notification = event_from_bus(event)
+        if notification is None or notification.recipient_id == notification.actor_id:
+            return None
+        return notification
+
+    def write(self, batch: list[NotificationEvent]):
+        with self.session_factory() as db:
+            write_batch(db, batch, self.bucket_seconds)
+
+
+@lru_cache
+def get_worker() -> NotificationWorker:
+    get_engine()
+    settings = get_settings()
+    worker = NotificationWorker(
+        SessionLocal,
+        bucket_seconds=settings.notification_bucket_minutes * 60,
+        batch_size=settings.notification_batch_size,
+        flush_seconds=settings.notification_flush_seconds,
+        background=settings.notification_background,
+    )
+    invalidation.subscribe(worker.on_event)
+    return worker
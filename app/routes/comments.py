@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy import and_
+from sqlalchemy.orm import Session, contains_eager, joinedload
 from typing import List, Annotated
 from datetime import datetime, timezone, timedelta
 
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import get_db, get_read_db
 from .. import exceptions
+from .. import invalidation, tags, trending, versions
 
 router = APIRouter(
     prefix="/comments",
@@ -13,22 +15,37 @@ router = APIRouter(
 )
 
 db_dependency = Annotated[Session, Depends(get_db)]
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
 
 @router.get("/{post_id}", response_model=List[schemas.Comment])
 def read_comments_for_post(
     post_id: int,
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     skip: int = 0,
     limit: int = 10,
 ):
-    comments = (
-        db.query(models.Comment)
-        .filter(models.Comment.post_id == post_id)
+    if cached := versions.not_modified(db, request, response, (f"comments:{post_id}",)):
+        return cached
+    # Outer join from the live post: its first page is never empty, even without
+    # comments, so only a post that is gone (or a page past the end) reads the archive
+    rows = (
+        db.query(models.Post.id, models.Comment)
+        .outerjoin(
+            models.Comment,
+            and_(models.Comment.post_id == models.Post.id, models.Comment.deleted_at.is_(None)),
+        )
+        .options(joinedload(models.Comment.owner))
+        .filter(models.Post.id == post_id, models.Post.deleted_at.is_(None))
         .order_by(models.Comment.timestamp.asc())
         .offset(skip)
         .limit(limit)
         .all()
     )
+    if not rows:
+        return _read_archived_comments(db, post_id, skip, limit)
+    comments = [comment for _, comment in rows if comment is not None]
 
     # Manually build response with owner_username
     result = []
@@ -43,6 +60,42 @@ def read_comments_for_post(
         ))
     return result
 
+def _read_archived_comments(db: Session, post_id: int, skip: int, limit: int) -> List[schemas.Comment]:
+    rows = (
+        db.query(models.CommentArchive, models.User.username)
+        .join(models.User, models.CommentArchive.owner_id == models.User.id)
+        .filter(models.CommentArchive.post_id == post_id)
+        .order_by(models.CommentArchive.timestamp.asc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [
+        schemas.Comment(
+            id=comment.id,
+            content=comment.content,
+            timestamp=comment.timestamp,
+            owner_id=comment.owner_id,
+            post_id=comment.post_id,
+            owner_username=owner_username
+        )
+        for comment, owner_username in rows
+    ]
+
+def _live_comment(db: Session, comment_id: int) -> models.Comment | None:
+    """The comment unless it, or the post it belongs to, is soft-deleted; `comment.post` comes loaded."""
+    return (
+        db.query(models.Comment)
+        .join(models.Comment.post)
+        .options(contains_eager(models.Comment.post))
+        .filter(
+            models.Comment.id == comment_id,
+            models.Comment.deleted_at.is_(None),
+            models.Post.deleted_at.is_(None),
+        )
+        .first()
+    )
+
 @router.post("/{post_id}", response_model=schemas.Comment)
 def create_comment_for_post(
     post_id: int,
@@ -50,7 +103,7 @@ def create_comment_for_post(
     db: db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    post = db.query(models.Post).filter_by(id=post_id).first()
+    post = db.query(models.Post).filter_by(id=post_id, deleted_at=None).first()
     if not post:
         exceptions.raise_not_found_exception("Post not found")
 
@@ -60,8 +113,15 @@ def create_comment_for_post(
         owner_id=current_user.id,
     )
     db.add(comment)
+    db.flush()
+    tags.index_comments(db, [comment])
+    invalidation.stage(
+        db, "comment", comment.id, "created",
+        post_id=post_id, owner_id=current_user.id, post_owner_id=post.owner_id,
+    )
     db.commit()
     db.refresh(comment)
+    trending.get_index().bump(db, post_id, trending.COMMENT_WEIGHT)
 
     return schemas.Comment(
         id=comment.id,
@@ -78,14 +138,23 @@ def delete_comment(
     db: db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    comment = db.query(models.Comment).filter_by(id=comment_id).first()
+    comment = _live_comment(db, comment_id)
     if not comment:
         exceptions.raise_not_found_exception("Comment not found")
     if comment.owner_id != current_user.id:
         exceptions.raise_forbidden_exception("Not authorized to delete this comment")
 
-    db.delete(comment)
+    post_id, post_owner_id = comment.post_id, comment.post.owner_id
+    commented_at = trending.timestamp(comment.timestamp)
+    # Soft delete; the row itself is purged when its post is archived
+    comment.deleted_at = datetime.now(timezone.utc)
+    tags.unindex_comments(db, [comment_id])
+    invalidation.stage(
+        db, "comment", comment_id, "deleted",
+        post_id=post_id, owner_id=current_user.id, post_owner_id=post_owner_id, at=commented_at,
+    )
     db.commit()
+    trending.get_index().bump(db, post_id, -trending.COMMENT_WEIGHT, at=commented_at)
 
 @router.put("/{comment_id}", response_model=schemas.Comment)
 def update_comment(
@@ -94,18 +163,24 @@ def update_comment(
     db: db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    comment = db.query(models.Comment).filter_by(id=comment_id).first()
+    comment = _live_comment(db, comment_id)
     if not comment:
         exceptions.raise_not_found_exception("Comment not found")
     if comment.owner_id != current_user.id:
         exceptions.raise_forbidden_exception("Not authorized to edit this comment")
 
-    time_since_creation = datetime.now(timezone.utc) - comment.timestamp
+    created_at = comment.timestamp
+    if created_at.tzinfo is None:
+        # SQLite hands timestamps back naive; they are stored in UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    time_since_creation = datetime.now(timezone.utc) - created_at
     if time_since_creation > timedelta(minutes=10):
         exceptions.raise_forbidden_exception("Edit time expired (10 min limit)")
 
     comment.content = comment_update.content
     db.add(comment)
+    tags.index_comments(db, [comment])
+    invalidation.stage(db, "comment", comment.id, "updated", post_id=comment.post_id, owner_id=current_user.id)
     db.commit()
     db.refresh(comment)
 
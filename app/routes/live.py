@@ -0,0 +1,87 @@
+import json
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.orm import Session
+
+from .. import models, auth
+from ..database import get_db
+from ..live import get_hub
+from ..exceptions import raise_bad_request_exception, raise_unauthorized_exception
+
+router = APIRouter(
+    prefix="/live",
+    tags=["live"],
+)
+
+db_dependency = Annotated[Session, Depends(get_db)]
+
+# EventSource cannot send headers, so the token may also come as ?token=
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+MAX_POSTS_PER_STREAM = 200
+KEEPALIVE_SECONDS = 15
+
+
+def _parse_ids(raw: str) -> set[int]:
+    try:
+        return {int(part) for part in raw.split(",") if part.strip()}
+    except ValueError:
+        raise_bad_request_exception("posts must be a comma-separated list of post ids")
+
+
+@router.get("/stream")
+def stream_updates(
+    request: Request,
+    db: db_dependency,
+    posts: str = "",
+    token: Optional[str] = Query(None),
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    """
+    Server-sent events for the posts currently on screen (`?posts=1,2,3`) and
+    for new posts from everyone the current user follows. Events are deltas:
+    `like` (with +1/-1), `comment_created|updated|deleted`, `post_created`,
+    `post_deleted`. Reconnect with a new `posts` list to change subscriptions.
+    """
+    if not (token or header_token):
+        raise_unauthorized_exception("Not authenticated")
+    current_user = auth.get_current_user(token or header_token, db)
+
+    post_ids = _parse_ids(posts)
+    if len(post_ids) > MAX_POSTS_PER_STREAM:
+        raise_bad_request_exception(f"At most {MAX_POSTS_PER_STREAM} posts per stream")
+
+    followee_ids = [
+        followee_id
+        for (followee_id,) in db.query(models.Follow.c.followee_id)
+        .filter(models.Follow.c.follower_id == current_user.id)
+    ]
+    topics = {f"post:{post_id}" for post_id in post_ids}
+    topics |= {f"user:{user_id}" for user_id in followee_ids + [current_user.id]}
+
+    async def events():
+        hub = get_hub()
+        subscription = hub.subscribe(topics)
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    message = await subscription.get(KEEPALIVE_SECONDS)
+                except ConnectionError:
+                    yield "event: dropped\ndata: {}\n\n"
+                    break
+                if message is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,100 @@
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+
+from .. import models, schemas, auth, media
+from ..config import get_settings
+from ..database import get_db, get_read_db
+from .. import exceptions, invalidation
+
+router = APIRouter(
+    prefix="/media",
+    tags=["media"],
+)
+
+db_dependency = Annotated[Session, Depends(get_db)]
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
+# Content-addressed files never change, so clients and proxies may keep them forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@router.post("/", response_model=schemas.Attachment, status_code=status.HTTP_201_CREATED)
+async def upload_media(
+    request: Request,
+    db: db_dependency,
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    Upload one image as multipart/form-data (field `file`). The body is
+    streamed to storage chunk by chunk; attach the returned id to a post via
+    `attachment_ids` in POST /posts/.
+    """
+    owner_id = current_user.id
+    # Auth ran a query; give its pooled connection back while a slow client streams
+    db.close()
+    try:
+        stored = await media.store_upload(request)
+    except media.UploadTooLarge:
+        exceptions.raise_payload_too_large_exception(
+            f"Attachments are limited to {get_settings().media_max_bytes} bytes"
+        )
+
+    def save():
+        attachment = models.Attachment(
+            sha256=stored.sha256,
+            content_type=stored.content_type,
+            size=stored.size,
+            owner_id=owner_id,
+        )
+        db.add(attachment)
+        db.flush()
+        invalidation.stage(db, "attachment", attachment.id, "created", owner_id=owner_id, size=stored.size)
+        db.commit()
+        db.refresh(attachment)
+        return attachment
+
+    return await run_in_threadpool(save)
+
+
+def _file_response(request: Request, attachment: models.Attachment, path: str, content_type: str):
+    etag = f'"{attachment.sha256}{"-thumb" if path != media.blob_path(attachment.sha256) else ""}"'
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    prefix = get_settings().media_accel_redirect_prefix
+    if prefix:
+        # Let the fronting nginx serve the file with sendfile(); it also handles Range
+        relative = os.path.relpath(path, get_settings().media_root)
+        headers["X-Accel-Redirect"] = f"{prefix.rstrip('/')}/{relative}"
+        return Response(media_type=content_type, headers=headers)
+    # FileResponse streams from disk and answers Range requests itself
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+
+def _get_attachment(db: Session, attachment_id: int) -> models.Attachment:
+    attachment = db.query(models.Attachment).filter_by(id=attachment_id).first()
+    if not attachment:
+        exceptions.raise_not_found_exception("Attachment not found")
+    return attachment
+
+
+@router.get("/{attachment_id}")
+def read_media(attachment_id: int, request: Request, db: read_db_dependency):
+    attachment = _get_attachment(db, attachment_id)
+    return _file_response(request, attachment, media.blob_path(attachment.sha256), attachment.content_type)
+
+
+@router.get("/{attachment_id}/thumbnail")
+def read_media_thumbnail(attachment_id: int, request: Request, db: read_db_dependency):
+    attachment = _get_attachment(db, attachment_id)
+    path = media.thumbnail_path(attachment.sha256)
+    if not os.path.exists(path):
+        # Not rendered (yet, or Pillow is not installed): fall back to the original
+        return _file_response(request, attachment, media.blob_path(attachment.sha256), attachment.content_type)
+    return _file_response(request, attachment, path, "image/jpeg")
@@ -0,0 +1,88 @@
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+from typing import Annotated, List
+
+from .. import models, schemas, auth, invalidation
+from ..database import get_db, get_read_db
+from ..notifications import refresh_unread_counts
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["notifications"],
+)
+
+db_dependency = Annotated[Session, Depends(get_db)]
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
+VERBS = {
+    "like": "liked your post",
+    "comment": "commented on your post",
+    "follow": "started following you",
+}
+
+
+def _message(notification: models.Notification, actor_username: str | None) -> str:
+    actor = actor_username or "Someone"
+    others = notification.count - 1
+    if others == 1:
+        actor += " and 1 other"
+    elif others > 1:
+        actor += f" and {others} others"
+    return f"{actor} {VERBS.get(notification.type, notification.type)}"
+
+
+@router.get("/", response_model=List[schemas.Notification])
+def read_notifications(
+    db: read_db_dependency,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    rows = (
+        db.query(models.Notification, models.User.username)
+        .outerjoin(models.User, models.Notification.last_actor_id == models.User.id)
+        .filter(models.Notification.recipient_id == current_user.id)
+        .order_by(models.Notification.updated_at.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [
+        schemas.Notification(
+            id=notification.id,
+            type=notification.type,
+            target_id=notification.target_id,
+            count=notification.count,
+            last_actor_id=notification.last_actor_id,
+            last_actor_username=actor_username,
+            message=_message(notification, actor_username),
+            read=notification.read,
+            updated_at=notification.updated_at,
+        )
+        for notification, actor_username in rows
+    ]
+
+
+@router.get("/unread_count", response_model=schemas.UnreadCount)
+def read_unread_count(current_user: models.User = Depends(auth.get_current_user)):
+    # Maintained column on the already-loaded user row; no COUNT(*) per poll
+    return schemas.UnreadCount(unread=current_user.unread_notifications)
+
+
+@router.post("/read", status_code=status.HTTP_204_NO_CONTENT)
+def mark_all_read(
+    db: db_dependency,
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    (
+        db.query(models.Notification)
+        .filter(
+            models.Notification.recipient_id == current_user.id,
+            models.Notification.read.is_(False),
+        )
+        .update({models.Notification.read: True}, synchronize_session=False)
+    )
+    # Recount instead of zeroing, in case the worker landed new rows meanwhile
+    refresh_unread_counts(db, {current_user.id})
+    invalidation.stage(db, "notification", current_user.id, "read")
+    db.commit()
@@ -1,13 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import func, select
 from typing import List, Annotated
 from datetime import timedelta, datetime, timezone
 from sqlalchemy.sql import func, exists
 
 from .. import models, schemas, auth
-from ..database import get_db
+from ..database import get_db, get_read_db
 from .. import exceptions
+from .. import archive, invalidation, stats, tags, trending, versions
 
 router = APIRouter(
     prefix="/posts",
@@ -15,12 +16,19 @@ router = APIRouter(
 )
 
 db_dependency = Annotated[Session, Depends(get_db)]
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
+MAX_ATTACHMENTS_PER_POST = 4
 
 
 @router.get("/", response_model=List[schemas.Post])
-def read_posts(db: db_dependency, skip: int = 0, limit: int = 10):
+def read_posts(request: Request, response: Response, db: read_db_dependency, skip: int = 0, limit: int = 10):
+    if cached := versions.not_modified(db, request, response, ("posts",)):
+        return cached
     posts = (
         db.query(models.Post)
+        .options(selectinload(models.Post.attachments))
+        .filter(models.Post.deleted_at.is_(None))
         .order_by(models.Post.timestamp.desc())
         .offset(skip)
         .limit(limit)
@@ -40,7 +48,26 @@ def create_new_post(
         content=post.content,
         owner_id=current_user.id
     )
+    if post.attachment_ids:
+        if len(post.attachment_ids) > MAX_ATTACHMENTS_PER_POST:
+            exceptions.raise_bad_request_exception(f"At most {MAX_ATTACHMENTS_PER_POST} attachments per post")
+        attachments = (
+            db.query(models.Attachment)
+            .filter(
+                models.Attachment.id.in_(post.attachment_ids),
+                models.Attachment.owner_id == current_user.id,
+                models.Attachment.post_id.is_(None),
+            )
+            .all()
+        )
+        if len(attachments) != len(set(post.attachment_ids)):
+            exceptions.raise_bad_request_exception("Unknown or already used attachment")
+        db_post.attachments = attachments
     db.add(db_post)
+    db.flush()
+    tags.index_posts(db, [db_post])
+    stats.adjust(db, current_user.id, refresh_last_post=True, post_count=1)
+    invalidation.stage(db, "post", db_post.id, "created", owner_id=current_user.id)
     db.commit()
     db.refresh(db_post)
     return db_post
@@ -54,14 +81,22 @@ def delete_post(
 ):
     post = db.query(models.Post).filter(
         models.Post.id == post_id,
-        models.Post.owner_id == current_user.id
+        models.Post.owner_id == current_user.id,
+        models.Post.deleted_at.is_(None),
     ).first()
 
     if not post:
         raise HTTPException(status_code=404, detail="Post not found or not yours to delete.")
 
-    db.delete(post)
+    # Soft delete; the row itself is purged by the archival job
+    post.deleted_at = datetime.now(timezone.utc)
+    tags.unindex_post(db, post_id)
+    db.query(models.PostScore).filter(models.PostScore.post_id == post_id).delete(synchronize_session=False)
+    db.flush()
+    stats.adjust(db, current_user.id, refresh_last_post=True, post_count=-1)
+    invalidation.stage(db, "post", post_id, "deleted", owner_id=current_user.id)
     db.commit()
+    trending.get_index().remove(post_id)
 
 
 @router.post("/{post_id}/like", status_code=status.HTTP_204_NO_CONTENT)
@@ -70,7 +105,7 @@ def like_post(
     db: db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    post = db.query(models.Post).filter_by(id=post_id).first()
+    post = db.query(models.Post).filter_by(id=post_id, deleted_at=None).first()
     if post is None:
         exceptions.raise_not_found_exception("Post not found")
 
@@ -80,7 +115,9 @@ def like_post(
 
     new_like = models.Like(user_id=current_user.id, post_id=post_id)
     db.add(new_like)
+    invalidation.stage(db, "post", post_id, "liked", user_id=current_user.id, owner_id=post.owner_id)
     db.commit()
+    trending.get_index().bump(db, post_id, trending.LIKE_WEIGHT)
 
 
 @router.post("/{post_id}/unlike", status_code=status.HTTP_204_NO_CONTENT)
@@ -89,40 +126,103 @@ def unlike_post(
     db: db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    like = db.query(models.Like).filter_by(user_id=current_user.id, post_id=post_id).first()
+    like, owner_id = (
+        db.query(models.Like, models.Post.owner_id)
+        .join(models.Post)
+        .filter(
+            models.Like.user_id == current_user.id,
+            models.Like.post_id == post_id,
+            models.Post.deleted_at.is_(None),
+        )
+        .first()
+    ) or (None, None)
     if not like:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not liked yet")
 
+    liked_at = trending.timestamp(like.created_at)
     db.delete(like)
+    invalidation.stage(
+        db, "post", post_id, "unliked", user_id=current_user.id, owner_id=owner_id, at=liked_at
+    )
     db.commit()
+    trending.get_index().bump(db, post_id, -trending.LIKE_WEIGHT, at=liked_at)
 
 
 @router.get("/mine", response_model=List[schemas.Post])
 def read_my_posts(
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
     """
     Get posts only created by the current user.
     """
+    if cached := versions.not_modified(db, request, response, (f"posts:{current_user.id}",), current_user.id):
+        return cached
     posts = (
         db.query(models.Post)
-        .filter(models.Post.owner_id == current_user.id)
+        .options(selectinload(models.Post.attachments))
+        .filter(models.Post.owner_id == current_user.id, models.Post.deleted_at.is_(None))
         .order_by(models.Post.timestamp.desc())
         .all()
     )
     return posts
 
 
+# -------------------- GET Trending Posts --------------------
+@router.get("/trending", response_model=List[schemas.TrendingPost])
+def read_trending_posts(db: read_db_dependency, limit: int = 10):
+    """
+    Rank posts by time-decayed engagement. Scores come from the in-memory
+    trending index, so no likes/comments aggregation happens here.
+    """
+    ranked = trending.get_index().top(db, limit)
+    if not ranked:
+        return []
+
+    rows = (
+        db.query(models.Post, models.User.username)
+        .options(selectinload(models.Post.attachments))
+        .join(models.User, models.Post.owner_id == models.User.id)
+        .filter(models.Post.id.in_([post_id for post_id, _ in ranked]), models.Post.deleted_at.is_(None))
+        .all()
+    )
+    by_id = {post.id: (post, owner_username) for post, owner_username in rows}
+
+    response_posts = []
+    for post_id, score in ranked:
+        if post_id not in by_id:
+            continue
+        post, owner_username = by_id[post_id]
+        response_posts.append(
+            schemas.TrendingPost(
+                id=post.id,
+                title=post.title,
+                content=post.content,
+                timestamp=post.timestamp,
+                owner_id=post.owner_id,
+                attachments=[schemas.Attachment.model_validate(a) for a in post.attachments],
+                owner_username=owner_username,
+                score=score,
+            )
+        )
+    return response_posts
+
 
 # -------------------- GET Posts With Counts -------------------- 
 @router.get("/with_counts/", response_model=List[schemas.PostWithCounts])
 def read_posts_with_counts(
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     skip: int = 0,
     limit: int = 10,
     current_user: models.User = Depends(auth.get_current_user),
 ):
+    # is_liked_by_current_user makes the page per caller
+    if cached := versions.not_modified(db, request, response, ("posts",), current_user.id):
+        return cached
     likes_subq = (
         db.query(
             models.Like.post_id,
@@ -138,6 +238,7 @@ def read_posts_with_counts(
             models.Comment.post_id,
             func.count(models.Comment.id).label("comments_count")
         )
+        .filter(models.Comment.deleted_at.is_(None))
         .group_by(models.Comment.post_id)
         .subquery()
     )
@@ -153,9 +254,11 @@ def read_posts_with_counts(
                 models.Like.user_id == current_user.id
             ).label("is_liked_by_current_user")
         )
+        .options(selectinload(models.Post.attachments))
         .join(models.User, models.Post.owner_id == models.User.id)
         .outerjoin(likes_subq, models.Post.id == likes_subq.c.post_id)
         .outerjoin(comments_subq, models.Post.id == comments_subq.c.post_id)  # ✅ added
+        .filter(models.Post.deleted_at.is_(None))
         .order_by(models.Post.timestamp.desc())
         .offset(skip)
         .limit(limit)
@@ -171,6 +274,7 @@ def read_posts_with_counts(
                 content=post.content,
                 timestamp=post.timestamp,
                 owner_id=post.owner_id,
+                attachments=[schemas.Attachment.model_validate(a) for a in post.attachments],
                 owner_username=owner_username,
                 likes_count=likes_count,
                 comments_count=comments_count,  # ✅ return this in schema
@@ -182,9 +286,13 @@ def read_posts_with_counts(
 @router.get("/user/{user_id}", response_model=List[schemas.PostWithCounts])
 def read_posts_of_user(
     user_id: int,
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
+    if cached := versions.not_modified(db, request, response, (f"posts:{user_id}",), current_user.id):
+        return cached
     likes_subq = (
         db.query(
             models.Like.post_id,
@@ -199,6 +307,7 @@ def read_posts_of_user(
             models.Comment.post_id,
             func.count(models.Comment.id).label("comments_count")
         )
+        .filter(models.Comment.deleted_at.is_(None))
         .group_by(models.Comment.post_id)
         .subquery()
     )
@@ -218,10 +327,11 @@ def read_posts_of_user(
             func.coalesce(comments_subq.c.comments_count, 0).label("comments_count"),
             is_liked_subq.label("is_liked_by_current_user")
         )
+        .options(selectinload(models.Post.attachments))
         .join(models.User, models.Post.owner_id == models.User.id)
         .outerjoin(likes_subq, models.Post.id == likes_subq.c.post_id)
         .outerjoin(comments_subq, models.Post.id == comments_subq.c.post_id)
-        .filter(models.Post.owner_id == user_id)  # ✅ Filter by the given user_id
+        .filter(models.Post.owner_id == user_id, models.Post.deleted_at.is_(None))  # ✅ Filter by the given user_id
         .order_by(models.Post.timestamp.desc())
         .all()
     )
@@ -235,6 +345,7 @@ def read_posts_of_user(
                 content=post.content,
                 timestamp=post.timestamp,
                 owner_id=post.owner_id,
+                attachments=[schemas.Attachment.model_validate(a) for a in post.attachments],
                 owner_username=owner_username,
                 likes_count=likes_count,
                 comments_count=comments_count,
@@ -242,3 +353,66 @@ def read_posts_of_user(
             )
         )
     return response_posts
+
+
+# -------------------- GET Single Post --------------------
+@router.get("/{post_id}", response_model=schemas.PostWithCounts)
+def read_post(
+    post_id: int,
+    db: read_db_dependency,
+    current_user: models.User = Depends(auth.get_current_user),
+):
+    """
+    One post with its counts. Posts moved out by the archival job are served
+    from the archive tables, so old links keep working.
+    """
+    row = (
+        db.query(
+            models.Post,
+            models.User.username,
+            select(func.count()).where(models.Like.post_id == models.Post.id).scalar_subquery(),
+            select(func.count()).where(
+                models.Comment.post_id == models.Post.id,
+                models.Comment.deleted_at.is_(None),
+            ).scalar_subquery(),
+            exists().where(models.Like.post_id == models.Post.id, models.Like.user_id == current_user.id),
+        )
+        .options(selectinload(models.Post.attachments))
+        .join(models.User, models.Post.owner_id == models.User.id)
+        .filter(models.Post.id == post_id, models.Post.deleted_at.is_(None))
+        .first()
+    )
+    if row is not None:
+        post, owner_username, likes_count, comments_count, is_liked = row
+        attachments = post.attachments
+    else:
+        Archived = models.PostArchive
+        row = (
+            db.query(
+                Archived,
+                models.User.username,
+                select(func.count()).where(models.LikeArchive.post_id == Archived.id).scalar_subquery(),
+                select(func.count()).where(models.CommentArchive.post_id == Archived.id).scalar_subquery(),
+                exists().where(models.LikeArchive.post_id == Archived.id, models.LikeArchive.user_id == current_user.id),
+            )
+            .join(models.User, Archived.owner_id == models.User.id)
+            .filter(Archived.id == post_id)
+            .first()
+        )
+        if row is None:
+            exceptions.raise_not_found_exception("Post not found")
+        post, owner_username, likes_count, comments_count, is_liked = row
+        attachments = archive.load_attachments(db, post)
+
+    return schemas.PostWithCounts(
+        id=post.id,
+        title=post.title,
+        content=post.content,
+        timestamp=post.timestamp,
+        owner_id=post.owner_id,
+        attachments=[schemas.Attachment.model_validate(a) for a in attachments],
+        owner_username=owner_username,
+        likes_count=likes_count,
+        comments_count=comments_count,
+        is_liked_by_current_user=is_liked,
+    )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Request, Response
+from sqlalchemy.orm import Session, joinedload
+from typing import Annotated, Optional
+
+from .. import models, schemas, versions
+from ..database import get_read_db
+
+router = APIRouter(
+    prefix="/tags",
+    tags=["tags"],
+)
+
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
+
+
+@router.get("/{tag}", response_model=schemas.TagPage)
+def read_tagged_posts(
+    tag: str,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
+    cursor: Optional[int] = None,
+    limit: int = 20,
+):
+    """
+    Posts (and comments on posts) carrying #tag, newest first. Pass the
+    returned `next_cursor` as `cursor` to get the next page.
+    """
+    if cached := versions.not_modified(db, request, response, ("posts",)):
+        return cached
+    limit = max(1, min(limit, 100))
+    query = (
+        db.query(models.Hashtag)
+        .options(joinedload(models.Hashtag.post).selectinload(models.Post.attachments))
+        .filter(models.Hashtag.tag == tag.lstrip("#").lower())
+    )
+    if cursor is not None:
+        query = query.filter(models.Hashtag.id < cursor)
+    hits = query.order_by(models.Hashtag.id.desc()).limit(limit + 1).all()
+
+    page = hits[:limit]
+    return schemas.TagPage(
+        items=page,
+        next_cursor=page[-1].id if len(hits) > limit else None,
+    )
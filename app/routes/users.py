@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Annotated, List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import Annotated, List, Optional
 
 
-from .. import models, schemas, auth
-from ..database import get_db
+from .. import archive, models, schemas, auth, invalidation, stats, versions
+from ..database import get_db, get_read_db
 from ..exceptions import (
     raise_not_found_exception,
     raise_bad_request_exception,
@@ -18,6 +19,7 @@ router = APIRouter(
 )
 
 db_dependency = Annotated[Session, Depends(get_db)]
+read_db_dependency = Annotated[Session, Depends(get_read_db)]
 
 
 @router.post("/", response_model=schemas.User)
@@ -35,27 +37,46 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         hashed_password=hashed_password  # This must NOT be None
     )
     db.add(new_user)
+    db.flush()
+    stats.create(db, new_user.id)
+    invalidation.stage(db, "user", new_user.id, "created")
     db.commit()
     db.refresh(new_user)
     return new_user
 @router.get("/", response_model=List[schemas.UserWithFollowers])
 def get_all_users(
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    users = db.query(models.User).filter(models.User.id != current_user.id).all()
+    if cached := versions.not_modified(db, request, response, ("users",), current_user.id):
+        return cached
+    users = (
+        db.query(models.User, models.UserStats.follower_count)
+        .outerjoin(models.UserStats, models.UserStats.user_id == models.User.id)
+        .filter(models.User.id != current_user.id)
+        .all()
+    )
+    following_ids = {
+        followee_id
+        for (followee_id,) in db.query(models.Follow.c.followee_id)
+        .filter(models.Follow.c.follower_id == current_user.id)
+    }
 
-    response = []
-    for user in users:
-        response.append(
+    result = []
+    for user, followers_count in users:
+        if followers_count is None:
+            followers_count = stats.get(db, user.id).follower_count
+        result.append(
             schemas.UserWithFollowers(
                 id=user.id,
                 username=user.username,
-                followers_count=len(user.followers),
-                is_following=current_user in user.followers
+                followers_count=followers_count,
+                is_following=user.id in following_ids
             )
         )
-    return response
+    return result
 
 
 @router.post("/{user_id}/follow", status_code=204)
@@ -76,6 +97,9 @@ def follow_user(
     if user_to_follow in current_user.following:
         raise_bad_request_exception("Already following this user")
     current_user.following.append(user_to_follow)
+    stats.adjust(db, user_id, follower_count=1)
+    stats.adjust(db, current_user.id, following_count=1)
+    invalidation.stage(db, "user", user_id, "followed", follower_id=current_user.id)
     db.commit()
 
 
@@ -97,17 +121,26 @@ def unfollow_user(
     if user_to_unfollow not in current_user.following:
         raise_bad_request_exception("Not following this user")
     current_user.following.remove(user_to_unfollow)
+    stats.adjust(db, user_id, follower_count=-1)
+    stats.adjust(db, current_user.id, following_count=-1)
+    invalidation.stage(db, "user", user_id, "unfollowed", follower_id=current_user.id)
     db.commit()
 
 
 @router.get("/me", response_model=schemas.MyProfileWithPosts)
 def read_users_me(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: models.User = Depends(get_current_user),
 ):
+    own = (f"posts:{current_user.id}", f"user:{current_user.id}")
+    if cached := versions.not_modified(db, request, response, own, current_user.id):
+        return cached
     posts = (
         db.query(models.Post)
-        .filter(models.Post.owner_id == current_user.id)
+        .options(selectinload(models.Post.likes), selectinload(models.Post.comments))
+        .filter(models.Post.owner_id == current_user.id, models.Post.deleted_at.is_(None))
         .order_by(models.Post.timestamp.desc())
         .all()
     )
@@ -115,8 +148,8 @@ def read_users_me(
     enriched_posts = []
     for post in posts:
         likes_count = len(post.likes)
-        comments_count = len(post.comments)
-        is_liked_by_current_user = current_user in [like.user for like in post.likes]
+        comments_count = sum(1 for comment in post.comments if comment.deleted_at is None)
+        is_liked_by_current_user = any(like.user_id == current_user.id for like in post.likes)
         
         enriched_posts.append(
             schemas.MyPost(
@@ -130,24 +163,97 @@ def read_users_me(
             )
         )
 
+    my_stats = stats.get(db, current_user.id)
     return schemas.MyProfileWithPosts(
         id=current_user.id,
         username=current_user.username,
-        followers_count=len(current_user.followers),
-        following_count=len(current_user.following),
+        followers_count=my_stats.follower_count,
+        following_count=my_stats.following_count,
         posts=enriched_posts
     )
 
+@router.get("/me/mentions", response_model=schemas.MentionPage)
+def read_my_mentions(
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
+    current_user: models.User = Depends(get_current_user),
+    cursor: Optional[int] = None,
+    limit: int = 20,
+):
+    """
+    Posts and comments that @mention the current user, newest first.
+    """
+    if cached := versions.not_modified(db, request, response, ("posts",), current_user.id):
+        return cached
+    limit = max(1, min(limit, 100))
+    query = (
+        db.query(models.Mention)
+        .options(joinedload(models.Mention.post).selectinload(models.Post.attachments))
+        .filter(models.Mention.user_id == current_user.id)
+    )
+    if cursor is not None:
+        query = query.filter(models.Mention.id < cursor)
+    mentions = query.order_by(models.Mention.id.desc()).limit(limit + 1).all()
+
+    page = mentions[:limit]
+    return schemas.MentionPage(
+        items=page,
+        next_cursor=page[-1].id if len(mentions) > limit else None,
+    )
+
+def _delete_account_rows(db: Session, user_id: int):
+    """
+    Delete a user and everything hanging off them with one statement per table,
+    however much they posted; the ORM cascade loaded every row first.
+    """
+    own_posts = select(models.Post.id).where(models.Post.owner_id == user_id)
+    own_comments = select(models.Comment.id).where(
+        or_(models.Comment.owner_id == user_id, models.Comment.post_id.in_(own_posts))
+    )
+    for model in (models.Hashtag, models.Mention):
+        db.execute(
+            delete(model).where(or_(model.post_id.in_(own_posts), model.comment_id.in_(own_comments)))
+        )
+    db.execute(delete(models.Mention).where(models.Mention.user_id == user_id))
+    for model in (models.Like, models.Retweet):
+        db.execute(delete(model).where(or_(model.user_id == user_id, model.post_id.in_(own_posts))))
+    db.execute(delete(models.PostScore).where(models.PostScore.post_id.in_(own_posts)))
+    db.execute(
+        delete(models.Comment).where(
+            or_(models.Comment.owner_id == user_id, models.Comment.post_id.in_(own_posts))
+        )
+    )
+    # Other users' uploads stay, detached; files are shared by content hash anyway
+    db.execute(delete(models.Attachment).where(models.Attachment.owner_id == user_id))
+    db.execute(
+        update(models.Attachment).where(models.Attachment.post_id.in_(own_posts)).values(post_id=None)
+    )
+    db.execute(delete(models.Notification).where(models.Notification.recipient_id == user_id))
+    db.execute(
+        update(models.Notification).where(models.Notification.last_actor_id == user_id).values(last_actor_id=None)
+    )
+    db.execute(delete(models.UserStats).where(models.UserStats.user_id == user_id))
+    db.execute(
+        delete(models.Follow).where(
+            or_(models.Follow.c.follower_id == user_id, models.Follow.c.followee_id == user_id)
+        )
+    )
+    db.execute(delete(models.Post).where(models.Post.owner_id == user_id))
+    db.execute(delete(models.User).where(models.User.id == user_id))
+
+
 @router.delete("/me", status_code=204)
 def delete_my_account(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_user),
 ):
-    user = db.query(models.User).filter(models.User.id == current_user.id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    db.delete(user)
+    # get_current_user loaded the row through this same session
+    user_id = current_user.id
+    stats.forget_follows(db, user_id)
+    archive.delete_user_rows(db, user_id)
+    _delete_account_rows(db, user_id)
+    invalidation.stage(db, "user", user_id, "deleted")
     db.commit()
 
 
@@ -155,28 +261,39 @@ def delete_my_account(
 @router.get("/{user_id}/profile", response_model=schemas.UserProfileWithPosts)
 def get_user_profile_with_posts(
     user_id: int,
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: models.User = Depends(auth.get_current_user),
+    skip: int = 0,
+    limit: int = 10,
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    if cached := versions.not_modified(db, request, response, (f"posts:{user_id}", f"user:{user_id}"), current_user.id):
+        return cached
+    # Header comes from user_stats via the hot-profile cache; only the page of posts is queried
+    summary = stats.profile_summary(db, user_id)
+    if summary is None:
         raise_not_found_exception("User not found")
 
-    # Check if the current user is following this user
-    is_following = current_user in user.followers
+    is_following = db.query(
+        exists().where(
+            models.Follow.c.follower_id == current_user.id,
+            models.Follow.c.followee_id == user_id,
+        )
+    ).scalar()
 
     posts = (
         db.query(models.Post)
-        .filter(models.Post.owner_id == user.id)
+        .options(selectinload(models.Post.attachments))
+        .filter(models.Post.owner_id == user_id, models.Post.deleted_at.is_(None))
         .order_by(models.Post.timestamp.desc())
+        .offset(skip)
+        .limit(max(1, min(limit, 100)))
         .all()
     )
 
     return schemas.UserProfileWithPosts(
-        id=user.id,
-        username=user.username,
-        followers_count=len(user.followers),
-        following_count=len(user.following),
+        **summary,
         is_following=is_following,
         posts=posts
     )
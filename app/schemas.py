@@ -49,6 +49,19 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 
+# ------------------------ Attachment Schemas ------------------------
+
+class Attachment(BaseModel):
+    id: int
+    sha256: str
+    content_type: str
+    size: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # ------------------------ Post Schemas ------------------------
 
 class PostBase(BaseModel):
@@ -56,7 +69,7 @@ class PostBase(BaseModel):
     content: str
 
 class PostCreate(PostBase):
-    pass
+    attachment_ids: List[int] = []  # ids returned by POST /media/
 
 class PostUpdate(PostBase):
     pass
@@ -65,6 +78,7 @@ class Post(PostBase):
     id: int
     timestamp: datetime
     owner_id: int
+    attachments: List[Attachment] = []
 
     class Config:
         from_attributes = True  # ✅ Required for .from_orm()
@@ -81,6 +95,14 @@ class PostWithCounts(Post):
         from_attributes = True
 
 
+class TrendingPost(Post):
+    owner_username: str
+    score: float
+
+    class Config:
+        from_attributes = True
+
+
 # ------------------------ Like Schemas ------------------------
 
 class Like(BaseModel):
@@ -125,12 +147,62 @@ class UserProfileWithPosts(BaseModel):
     username: str
     followers_count: int
     following_count: int
+    post_count: int = 0
+    last_post_at: Optional[datetime] = None
     is_following: bool
     posts: List[Post]  # assuming your Post schema exists
 
     class Config:
         orm_mode = True
 
+# ------------------------ Hashtag / Mention Schemas ------------------------
+
+class TagHit(BaseModel):
+    id: int  # cursor
+    comment_id: Optional[int] = None  # set when the tag appears in a comment on `post`
+    post: Post
+
+    class Config:
+        from_attributes = True
+
+class TagPage(BaseModel):
+    items: List[TagHit]
+    next_cursor: Optional[int] = None
+
+class MentionHit(BaseModel):
+    id: int  # cursor
+    author_id: int
+    comment_id: Optional[int] = None
+    post: Post
+
+    class Config:
+        from_attributes = True
+
+class MentionPage(BaseModel):
+    items: List[MentionHit]
+    next_cursor: Optional[int] = None
+
+
+# ------------------------ Notification Schemas ------------------------
+
+class Notification(BaseModel):
+    id: int
+    type: str
+    target_id: int
+    count: int
+    last_actor_id: Optional[int] = None
+    last_actor_username: Optional[str] = None
+    message: str
+    read: bool
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class UnreadCount(BaseModel):
+    unread: int
+
+
 class MyPost(BaseModel):
     id: int
     title: str
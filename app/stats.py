@@ -0,0 +1,153 @@
+"""
+Materialized per-user counters (`user_stats`).
+
+Post, follower and following counts and the last post time are adjusted in the
+same transaction as the write that changes them, so profile reads never count
+rows. Profile summaries built from them are kept in a small per-worker cache
+that invalidation events evict. Each entry remembers the `user:{id}` resource
+version it was read at, so a summary filled from a lagging replica is never
+served to a reader that has already seen a newer version.
+"""
+from functools import lru_cache
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from . import invalidation, models, versions
+from .cache import EntityCache
+from .config import get_settings
+
+
+def _post_count(owner_id):
+    """Visible posts of `owner_id`: live ones plus those moved to the archive."""
+    posts = models.Post.__table__
+    archive = models.PostArchive.__table__
+    live = select(func.count()).where(posts.c.owner_id == owner_id, posts.c.deleted_at.is_(None))
+    archived = select(func.count()).where(archive.c.owner_id == owner_id)
+    return live.scalar_subquery() + archived.scalar_subquery()
+
+
+def _last_post_at(owner_id):
+    posts = models.Post.__table__
+    archive = models.PostArchive.__table__
+    live = select(func.max(posts.c.timestamp)).where(posts.c.owner_id == owner_id, posts.c.deleted_at.is_(None))
+    archived = select(func.max(archive.c.timestamp)).where(archive.c.owner_id == owner_id)
+    return func.coalesce(live.scalar_subquery(), archived.scalar_subquery())
+
+
+def _computed_stats(user_ids):
+    """SELECT producing user_stats rows for `user_ids` from the source tables."""
+    users = models.User.__table__
+    follows = models.Follow
+
+    return select(
+        users.c.id,
+        _post_count(users.c.id),
+        select(func.count()).where(follows.c.followee_id == users.c.id).scalar_subquery(),
+        select(func.count()).where(follows.c.follower_id == users.c.id).scalar_subquery(),
+        _last_post_at(users.c.id),
+    ).where(
+        users.c.id.in_(user_ids),
+        ~select(models.UserStats.user_id).where(models.UserStats.user_id == users.c.id).exists(),
+    )
+
+
+def _insert_computed(bind, user_ids):
+    table = models.UserStats.__table__
+    bind.execute(
+        insert(table).from_select(
+            ["user_id", "post_count", "follower_count", "following_count", "last_post_at"],
+            _computed_stats(user_ids),
+        )
+    )
+
+
+def create(db: Session, user_id: int):
+    db.add(models.UserStats(user_id=user_id))
+
+
+def adjust(db: Session, user_id: int, refresh_last_post: bool = False, **deltas: int):
+    """Apply counter deltas, e.g. adjust(db, 3, follower_count=1). Call before commit."""
+    table = models.UserStats.__table__
+    values = {name: table.c[name] + delta for name, delta in deltas.items()}
+    if refresh_last_post:
+        values["last_post_at"] = _last_post_at(user_id)
+    result = db.execute(update(table).where(table.c.user_id == user_id).values(**values))
+    if result.rowcount == 0:
+        # Row missing (e.g. user predates the table): compute it; the pending change is already flushed
+        db.flush()
+        _insert_computed(db, [user_id])
+
+
+def forget_follows(db: Session, user_id: int):
+    """Drop `user_id`'s follow edges from everyone else's counters. Call before deleting the user."""
+    table = models.UserStats.__table__
+    follows = models.Follow
+    db.execute(
+        update(table)
+        .where(table.c.user_id.in_(select(follows.c.followee_id).where(follows.c.follower_id == user_id)))
+        .values(follower_count=table.c.follower_count - 1)
+    )
+    db.execute(
+        update(table)
+        .where(table.c.user_id.in_(select(follows.c.follower_id).where(follows.c.followee_id == user_id)))
+        .values(following_count=table.c.following_count - 1)
+    )
+
+
+def get(db: Session, user_id: int) -> models.UserStats:
+    stats = db.get(models.UserStats, user_id)
+    if stats is None:
+        # Read paths may be on a replica: compute a transient row rather than insert one
+        row = db.execute(_computed_stats([user_id])).first()
+        stats = models.UserStats(
+            user_id=user_id,
+            post_count=row[1] if row else 0,
+            follower_count=row[2] if row else 0,
+            following_count=row[3] if row else 0,
+            last_post_at=row[4] if row else None,
+        )
+    return stats
+
+
+# -------------------- Hot profile cache --------------------
+
+def _evict_profiles(event: invalidation.Event):
+    cache = get_profile_cache()
+    if event.entity == "user":
+        cache.evict(event.entity_id, event.data.get("follower_id"))
+    elif event.entity == "post" and event.action in ("created", "deleted"):
+        cache.evict(event.data.get("owner_id"))
+
+
+@lru_cache
+def get_profile_cache() -> EntityCache:
+    settings = get_settings()
+    cache = EntityCache(settings.profile_cache_size, settings.profile_cache_seconds)
+    invalidation.subscribe(_evict_profiles)
+    return cache
+
+
+def profile_summary(db: Session, user_id: int) -> dict | None:
+    """Username and counters for a profile header, served from the hot-profile cache."""
+    cache = get_profile_cache()
+    current = versions.get_versions().get(db, f"user:{user_id}")
+    entry = cache.get(user_id)
+    if entry is not None and all(seen >= now for seen, now in zip(entry[0], current)):
+        return entry[1]
+
+    user = db.get(models.User, user_id)
+    if user is None:
+        return None
+    stats = get(db, user_id)
+    summary = {
+        "id": user.id,
+        "username": user.username,
+        "post_count": stats.post_count,
+        "followers_count": stats.follower_count,
+        "following_count": stats.following_count,
+        "last_post_at": stats.last_post_at,
+    }
+    if entry is None or all(now >= seen for seen, now in zip(entry[0], current)):
+        cache.set(user_id, (current, summary))
+    return summary
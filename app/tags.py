@@ -0,0 +1,131 @@
+"""
+Hashtag and @mention extraction.
+
+Posts and comments are indexed into the `hashtags` and `mentions` tables in
+the same transaction as the write, so /tags/{tag} and /users/me/mentions read
+straight from those indexes. Existing rows can be indexed with:
+
+    python -m app.tags backfill --batch-size 500
+"""
+import argparse
+import re
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+HASHTAG_RE = re.compile(r"(?<![\w#])#(\w{1,50})")
+MENTION_RE = re.compile(r"(?<![\w@])@(\w{1,50})")
+
+
+def extract_hashtags(text: str) -> set[str]:
+    return {tag.lower() for tag in HASHTAG_RE.findall(text or "")}
+
+
+def extract_mentions(text: str) -> set[str]:
+    return set(MENTION_RE.findall(text or ""))
+
+
+def _resolve_usernames(db: Session, usernames: set[str]) -> dict[str, int]:
+    if not usernames:
+        return {}
+    rows = db.query(models.User.username, models.User.id).filter(models.User.username.in_(usernames))
+    return {username: user_id for username, user_id in rows}
+
+
+def _index(db: Session, sources: list[tuple[int, int | None, int, str]]):
+    """sources: (post_id, comment_id or None, author_id, text) already cleared of old rows."""
+    parsed = [(post_id, comment_id, author_id, extract_hashtags(text), extract_mentions(text))
+              for post_id, comment_id, author_id, text in sources]
+    user_ids = _resolve_usernames(db, set().union(*(mentions for *_, mentions in parsed)))
+
+    for post_id, comment_id, author_id, hashtags, mentions in parsed:
+        for tag in hashtags:
+            db.add(models.Hashtag(tag=tag, post_id=post_id, comment_id=comment_id))
+        for username in mentions:
+            if username in user_ids:
+                db.add(models.Mention(
+                    user_id=user_ids[username],
+                    author_id=author_id,
+                    post_id=post_id,
+                    comment_id=comment_id,
+                ))
+
+
+def index_posts(db: Session, posts: list[models.Post]):
+    """(Re)index post bodies. Call after flush so ids exist, before commit."""
+    post_ids = [post.id for post in posts]
+    for model in (models.Hashtag, models.Mention):
+        (
+            db.query(model)
+            .filter(model.post_id.in_(post_ids), model.comment_id.is_(None))
+            .delete(synchronize_session=False)
+        )
+    _index(db, [(post.id, None, post.owner_id, post.content) for post in posts])
+
+
+def index_comments(db: Session, comments: list[models.Comment]):
+    """(Re)index comment bodies. Call after flush so ids exist, before commit."""
+    comment_ids = [comment.id for comment in comments]
+    for model in (models.Hashtag, models.Mention):
+        db.query(model).filter(model.comment_id.in_(comment_ids)).delete(synchronize_session=False)
+    _index(db, [(comment.post_id, comment.id, comment.owner_id, comment.content) for comment in comments])
+
+
+def unindex_post(db: Session, post_id: int):
+    """Drop index rows of a post and of every comment on it (soft delete)."""
+    for model in (models.Hashtag, models.Mention):
+        db.query(model).filter(model.post_id == post_id).delete(synchronize_session=False)
+
+
+def unindex_comments(db: Session, comment_ids: list[int]):
+    for model in (models.Hashtag, models.Mention):
+        db.query(model).filter(model.comment_id.in_(comment_ids)).delete(synchronize_session=False)
+
+
+def backfill(db: Session, batch_size: int = 500) -> tuple[int, int]:
+    """Index every post and comment in id order, committing once per batch."""
+    counts = []
+    live_comments = db.query(models.Comment).join(models.Post).filter(models.Post.deleted_at.is_(None))
+    sources = (
+        (models.Post, db.query(models.Post), index_posts),
+        (models.Comment, live_comments, index_comments),
+    )
+    for model, query, index in sources:
+        last_id, done = 0, 0
+        while True:
+            batch = (
+                query
+                .filter(model.id > last_id, model.deleted_at.is_(None))
+                .order_by(model.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+            index(db, batch)
+            db.commit()
+            db.expunge_all()
+            done += len(batch)
+        counts.append(done)
+    return counts[0], counts[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.tags")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("backfill", help="index hashtags and mentions of existing rows")
+    run.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    from .database import SessionLocal, get_engine
+
+    get_engine()
+    with SessionLocal() as db:
+        posts, comments = backfill(db, args.batch_size)
+    print(f"indexed {posts} posts and {comments} comments")
+
+
+if __name__ == "__main__":
+    main()
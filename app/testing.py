@@ -0,0 +1,337 @@
+"""
+In-process test harness.
+
+Builds the API against an in-memory SQLite database created by the real
+migrations. Every test runs inside one outer transaction that is rolled back
+afterwards; the handlers' own commits are not propagated to it. Requests made
+through `BudgetedClient` count the SQL statements they issue and time
+themselves against `ROUTE_BUDGETS`. Needs httpx, like TestClient.
+
+As a pytest plugin (add `pytest_plugins = ["app.testing"]` to a conftest.py)
+it provides the `sqlite_engine`, `api`, `db_session` and `client` fixtures.
+benchmarks/routes.py drives the same pieces directly; tests/ uses the fixtures.
+"""
+import dataclasses
+import importlib.util
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from starlette.routing import Match
+
+from .config import Settings
+
+# Statements the harness itself issues around each test, not the handler
+_HARNESS_SQL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN")
+
+
+def test_settings(**overrides) -> Settings:
+    """
+    Settings for an isolated in-process API: no replicas, local bus, no event
+    log, cheap hashing, and no background threads sharing the test connection.
+    """
+    defaults = dict(
+        database_url="sqlite://",
+        secret_key="test-secret-key",
+        bcrypt_rounds=4,
+        invalidation_bus_url="",
+        trending_flush_seconds=3600,  # flushes would make query counts timing-dependent
+        notification_background=False,  # BudgetedClient drains the queue after each request
+        media_root=os.path.join(tempfile.gettempdir(), f"weconnect-test-media-{os.getpid()}"),
+        event_log_dir="",
+    )
+    return dataclasses.replace(Settings(), **{**defaults, **overrides})
+
+
+def create_test_engine() -> Engine:
+    """A private in-memory database, migrated to head. One per process or worker."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,  # every session shares the one in-memory connection
+    )
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+    @event.listens_for(engine, "connect")
+    def _no_pysqlite_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    from . import migrations
+
+    migrations.upgrade(engine)
+    return engine
+
+
+def create_test_app(engine: Engine, **overrides):
+    """The API on `engine` with test_settings(**overrides), active in this process."""
+    from .main import activate, create_app
+
+    app = create_app(test_settings(**overrides), engine)
+    activate(app)  # what startup does; the harness never runs the lifespan
+    return app
+
+
+def reset_singletons():
+    """Drop per-process state (bus, caches, trending scores) so runs do not leak into each other."""
+    from . import auth, eventlog, invalidation, live, notifications, stats, trending, versions
+    from .database import get_replica_router
+
+    if notifications.get_worker.cache_info().currsize:
+        notifications.get_worker().stop()
+    if trending.get_index.cache_info().currsize:
+        trending.get_index().stop(flush=False)
+    if eventlog.get_writer.cache_info().currsize and eventlog.get_writer():
+        eventlog.get_writer().stop()
+    for getter in (
+        invalidation.get_bus,
+        trending.get_index,
+        stats.get_profile_cache,
+        versions.get_versions,
+        live.get_hub,
+        notifications.get_worker,
+        eventlog.get_writer,
+        get_replica_router,
+        auth.get_pwd_context,
+    ):
+        getter.cache_clear()
+
+
+@contextmanager
+def rollback_session(engine: Engine):
+    """
+    Bind the application's sessions to one connection inside a transaction
+    that is rolled back on exit. Yields a session for arranging test data.
+    """
+    from . import notifications
+    from .database import SessionLocal, get_engine
+
+    get_engine()  # binds SessionLocal to the engine once; rebound below
+    reset_singletons()
+    connection = engine.connect()
+    transaction = connection.begin()
+    # A request opens two sessions (auth and handler); savepoints from both would
+    # interleave on the shared connection, so commits simply stay in the outer transaction
+    SessionLocal.configure(bind=connection, join_transaction_mode="rollback_only")
+    # Subscribed before the first write, as the lifespan does
+    notifications.get_worker()  # drained by BudgetedClient
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+        SessionLocal.configure(bind=engine, join_transaction_mode="conditional_savepoint")
+        reset_singletons()
+
+
+class QueryCounter:
+    """Counts SQL statements sent through `engine` while active."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith(_HARNESS_SQL):
+            self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+# -------------------- Budgets --------------------
+
+@dataclass(frozen=True)
+class Budget:
+    max_queries: int
+    max_ms: float
+
+
+@dataclass
+class Measurement:
+    method: str
+    path: str
+    status_code: int
+    queries: int
+    ms: float
+
+    def exceeds(self, budget: Budget, latency_scale: float | None = None) -> bool:
+        """Over the query budget, or with a `latency_scale`, over the scaled latency ceiling."""
+        if self.queries > budget.max_queries:
+            return True
+        return latency_scale is not None and self.ms > budget.max_ms * latency_scale
+
+
+# Per route template. Query budgets are targets, not measurements: each is what
+# the route needs for any amount of data (tests/test_routes.py checks that the
+# counts do not grow with it), including the archive fallbacks of
+# GET /posts/{post_id} and GET /comments/{post_id} and the trending index's
+# first load on a like or comment. Conditional lists read their resource
+# versions and writes bump them, one statement each. Query counts are exact on
+# any machine and are always enforced; latency ceilings are for a warm process
+# on an idle machine and only benchmarks/routes.py checks them, on the median
+# and scaled by --latency-scale for slower hosts.
+ROUTE_BUDGETS: dict[tuple[str, str], Budget] = {
+    ("POST", "/token"): Budget(1, 100),
+    ("POST", "/users/"): Budget(5, 100),
+    ("GET", "/users/"): Budget(4, 100),
+    ("POST", "/users/{user_id}/follow"): Budget(7, 100),
+    ("POST", "/users/{user_id}/unfollow"): Budget(7, 100),
+    ("GET", "/users/me"): Budget(6, 100),
+    ("GET", "/users/me/mentions"): Budget(4, 100),
+    ("DELETE", "/users/me"): Budget(22, 100),  # one statement per table, however much the user posted
+    ("GET", "/users/{user_id}/profile"): Budget(7, 100),
+    ("GET", "/posts/"): Budget(3, 100),
+    ("POST", "/posts/"): Budget(11, 100),
+    ("DELETE", "/posts/{post_id}"): Budget(8, 100),
+    ("POST", "/posts/{post_id}/like"): Budget(7, 100),
+    ("POST", "/posts/{post_id}/unlike"): Budget(4, 100),
+    ("GET", "/posts/mine"): Budget(4, 100),
+    ("GET", "/posts/trending"): Budget(2, 100),
+    ("GET", "/posts/with_counts/"): Budget(4, 100),
+    ("GET", "/posts/user/{user_id}"): Budget(4, 100),
+    ("GET", "/posts/{post_id}"): Budget(4, 100),
+    ("GET", "/comments/{post_id}"): Budget(3, 100),
+    ("POST", "/comments/{post_id}"): Budget(10, 100),
+    ("DELETE", "/comments/{comment_id}"): Budget(6, 100),
+    ("PUT", "/comments/{comment_id}"): Budget(8, 100),
+}
+
+
+def budgeted_routes() -> set[tuple[str, str]]:
+    """(method, path) of every route in the auth, users, posts and comments routers."""
+    from .auth import router as auth_router
+    from .routes import comments, posts, users
+
+    return {
+        (method, route.path)
+        for router in (auth_router, users.router, posts.router, comments.router)
+        for route in router.routes
+        for method in route.methods
+    }
+
+
+def missing_budgets() -> set[tuple[str, str]]:
+    return budgeted_routes() - ROUTE_BUDGETS.keys()
+
+
+def route_for(app, method: str, path: str) -> str | None:
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in app.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return None
+
+
+class BudgetedClient(TestClient):
+    """
+    TestClient that measures every request. With `enforce`, a request over its
+    route's query budget raises AssertionError listing the statements it ran;
+    latency counts too only when a `latency_scale` is given.
+    """
+
+    def __init__(
+        self, app, engine: Engine, budgets=None, enforce: bool = True, latency_scale: float | None = None, **kwargs
+    ):
+        super().__init__(app, **kwargs)
+        self.engine = engine
+        self.budgets = ROUTE_BUDGETS if budgets is None else budgets
+        self.enforce = enforce
+        self.latency_scale = latency_scale
+        self.measurements: list[Measurement] = []
+
+    def request(self, method, url, *args, **kwargs):
+        method = method.upper()
+        path = route_for(self.app, method, urlsplit(str(url)).path) or str(url)
+        with QueryCounter(self.engine) as counter:
+            started = time.perf_counter()
+            response = super().request(method, url, *args, **kwargs)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        measurement = Measurement(method, path, response.status_code, counter.count, elapsed_ms)
+        self.measurements.append(measurement)
+        self._drain_notifications()
+
+        budget = self.budgets.get((method, path))
+        if self.enforce and budget is not None and measurement.exceeds(budget, self.latency_scale):
+            raise AssertionError(
+                f"{method} {path}: {counter.count} queries in {elapsed_ms:.1f} ms, "
+                f"budget {budget.max_queries} queries / {budget.max_ms:.0f} ms\n"
+                + "\n".join(counter.statements)
+            )
+        return response
+
+    def _drain_notifications(self):
+        # Off the request path in production; here, outside the measurement and in this thread
+        from . import notifications
+
+        if notifications.get_worker.cache_info().currsize and not notifications.get_worker().background:
+            notifications.get_worker().drain()
+
+    def violations(self) -> list[tuple[Measurement, Budget]]:
+        return [
+            (measurement, self.budgets[(measurement.method, measurement.path)])
+            for measurement in self.measurements
+            if (measurement.method, measurement.path) in self.budgets
+            and measurement.exceeds(self.budgets[(measurement.method, measurement.path)], self.latency_scale)
+        ]
+
+
+def sign_up(client, username: str, password: str = "password") -> dict:
+    """Create a user and return Authorization headers for it."""
+    client.post("/users/", json={"username": username, "email": f"{username}@example.com", "password": password})
+    token = client.post("/token", data={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+# -------------------- pytest plugin --------------------
+
+if importlib.util.find_spec("pytest") is not None:
+    import pytest
+
+    @pytest.fixture(scope="session")
+    def sqlite_engine():
+        engine = create_test_engine()
+        yield engine
+        engine.dispose()
+
+    @pytest.fixture(scope="session")
+    def api(sqlite_engine):
+        from .main import deactivate
+
+        api = create_test_app(sqlite_engine)
+        with rollback_session(sqlite_engine):
+            # Lazy imports and statement caches are paid here, outside any measurement
+            sign_up(TestClient(api), "warm-up")
+        yield api
+        deactivate(api)
+
+    @pytest.fixture
+    def db_session(sqlite_engine, api) -> Session:
+        with rollback_session(sqlite_engine) as db:
+            yield db
+
+    @pytest.fixture
+    def client(api, sqlite_engine, db_session) -> BudgetedClient:
+        return BudgetedClient(api, sqlite_engine)
@@ -0,0 +1,297 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+from .config import get_settings
+from .database import SessionLocal, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Engagement weights applied to a post's trending score
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+RETWEET_WEIGHT = 3.0
+
+_EVENT_WEIGHTS = {
+    ("post", "liked"): LIKE_WEIGHT,
+    ("post", "unliked"): -LIKE_WEIGHT,
+    ("comment", "created"): COMMENT_WEIGHT,
+    ("comment", "deleted"): -COMMENT_WEIGHT,
+}
+
+# Rebase the reference frame before 2 ** exponent gets anywhere near overflow
+_MAX_EXPONENT = 512.0
+
+
+def timestamp(value: datetime | None) -> float | None:
+    """Seconds since the epoch; naive datetimes (SQLite) are stored in UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class TrendingIndex:
+    """
+    Time-decayed engagement scores with an in-memory top-K heap.
+
+    Scores are stored in a fixed reference frame anchored at `_epoch`: an event
+    of weight w at time t adds w * 2 ** ((t - epoch) / half_life). Ordering in
+    that frame equals ordering by decayed score, so nothing has to be rescaled
+    as time passes; the decayed value is only computed when reading. Undoing an
+    event subtracts the same term, so the undo has to know the original t.
+
+    Dirty scores are persisted by a background thread every `flush_seconds`
+    and once more on stop(), never on the request path.
+    """
+
+    def __init__(self, half_life_seconds: float, capacity: int, flush_seconds: float, session_factory=None):
+        self.half_life = half_life_seconds
+        self.capacity = capacity
+        self.flush_seconds = flush_seconds
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._epoch = time.time()
+        self._scores: dict[int, float] = {}   # post_id -> score in the epoch frame
+        self._top: dict[int, float] = {}      # candidates currently tracked by the heap
+        self._heap: list[tuple[float, int]] = []  # min-heap over _top, may hold stale entries
+        self._dirty: set[int] = set()
+        self._loaded = False
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # -------------------- frame helpers --------------------
+
+    def _growth(self, now: float) -> float:
+        return 2.0 ** ((now - self._epoch) / self.half_life)
+
+    def _rebase(self, now: float):
+        factor = 1.0 / self._growth(now)
+        self._epoch = now
+        self._scores = {
+            post_id: score * factor
+            for post_id, score in self._scores.items()
+            if post_id in self._dirty or abs(score * factor) > 1e-6
+        }
+        self._top = {post_id: self._scores[post_id] for post_id in self._top if post_id in self._scores}
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(score, post_id) for post_id, score in self._top.items()]
+        heapq.heapify(self._heap)
+
+    def _to_frame(self, value: float, scored_at: datetime | None, now: float) -> float:
+        return value * self._growth(timestamp(scored_at) or now)
+
+    def _add(self, post_id: int, weight: float, at: float | None, now: float) -> float:
+        # Clamped because events from before the index existed (or likes without
+        # a recorded time) may be undone against a score that never held them
+        score = max(self._scores[post_id] + weight * self._growth(at or now), 0.0)
+        self._scores[post_id] = score
+        self._offer(post_id, score)
+        return score
+
+    # -------------------- heap maintenance --------------------
+
+    def _min_top(self) -> float:
+        while self._heap and self._top.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else -math.inf
+
+    def _offer(self, post_id: int, score: float):
+        if post_id in self._top:
+            self._top[post_id] = score
+            heapq.heappush(self._heap, (score, post_id))
+        elif len(self._top) < self.capacity:
+            self._top[post_id] = score
+            heapq.heappush(self._heap, (score, post_id))
+        elif score > self._min_top():
+            _, evicted = heapq.heappop(self._heap)
+            del self._top[evicted]
+            self._top[post_id] = score
+            heapq.heappush(self._heap, (score, post_id))
+
+        # Stale entries pile up when the same post is bumped repeatedly
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    # -------------------- persistence --------------------
+
+    def _load(self, db: Session):
+        now = time.time()
+        rows = (
+            db.query(models.PostScore)
+            .order_by(models.PostScore.score.desc())
+            .limit(self.capacity)
+            .all()
+        )
+        with self._lock:
+            if self._loaded:
+                return
+            for row in rows:
+                if row.post_id not in self._scores:
+                    self._scores[row.post_id] = self._to_frame(row.score, row.updated_at, now)
+                    self._offer(row.post_id, self._scores[row.post_id])
+            self._loaded = True
+
+    def flush(self, db: Session):
+        """Persist dirty scores as decayed values stamped with the flush time."""
+        with self._lock:
+            now = time.time()
+            growth = self._growth(now)
+            pending = {post_id: self._scores[post_id] / growth for post_id in self._dirty if post_id in self._scores}
+            self._dirty.clear()
+        if not pending:
+            return
+        try:
+            self._persist(db, pending, now)
+        except Exception:
+            # Retry with the next flush rather than losing the scores
+            with self._lock:
+                self._dirty.update(post_id for post_id in pending if post_id in self._scores)
+            raise
+
+    def _persist(self, db: Session, pending: dict[int, float], now: float):
+        # Posts soft-deleted or archived since they were bumped are dropped, not persisted
+        live = {
+            post_id
+            for (post_id,) in db.query(models.Post.id)
+            .filter(models.Post.id.in_(pending), models.Post.deleted_at.is_(None))
+        }
+        for post_id in pending.keys() - live:
+            self.remove(post_id)
+            del pending[post_id]
+        if not pending:
+            return
+
+        scored_at = datetime.fromtimestamp(now, tz=timezone.utc)
+        existing = {
+            row.post_id: row
+            for row in db.query(models.PostScore).filter(models.PostScore.post_id.in_(pending))
+        }
+        for post_id, value in pending.items():
+            row = existing.get(post_id)
+            if row is None:
+                db.add(models.PostScore(post_id=post_id, score=value, updated_at=scored_at))
+            else:
+                row.score = value
+                row.updated_at = scored_at
+        db.commit()
+
+    def _flush_in_background(self):
+        if self.session_factory is None:
+            return
+        try:
+            with self.session_factory() as db:
+                self.flush(db)
+        except Exception:
+            logger.exception("Flushing trending scores failed")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_seconds):
+            self._flush_in_background()
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread is None and self.session_factory is not None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="trending-flush", daemon=True)
+                self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Stop the flush thread and, unless `flush` is false, persist what is still dirty."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+        if flush:
+            self._flush_in_background()
+
+    # -------------------- public API --------------------
+
+    def bump(self, db: Session, post_id: int, weight: float, at: float | None = None):
+        """
+        Apply an engagement event made at time `at` (default: now) to a post.
+        To undo one, pass the negative weight and the time of the original event.
+        """
+        if not self._loaded:
+            self._load(db)
+
+        persisted = None
+        if post_id not in self._scores:
+            persisted = db.query(models.PostScore).filter_by(post_id=post_id).first()
+
+        with self._lock:
+            now = time.time()
+            if (now - self._epoch) / self.half_life > _MAX_EXPONENT:
+                self._rebase(now)
+            if post_id not in self._scores:
+                self._scores[post_id] = (
+                    self._to_frame(persisted.score, persisted.updated_at, now) if persisted else 0.0
+                )
+            self._add(post_id, weight, at, now)
+            self._dirty.add(post_id)
+        self.start()
+
+    def apply(self, post_id: int, weight: float, at: float | None = None):
+        """
+        In-memory only variant of bump() for events from other workers. Posts
+        this worker has not scored yet are skipped; their persisted score is
+        picked up on the next local bump.
+        """
+        with self._lock:
+            if post_id not in self._scores:
+                return
+            self._add(post_id, weight, at, time.time())
+
+    def on_event(self, event: invalidation.Event):
+        if event.entity == "post" and event.action == "deleted":
+            self.remove(event.entity_id)
+            return
+        # Our own writes were already applied by bump() in the request
+        if invalidation.get_bus().is_local(event):
+            return
+        weight = _EVENT_WEIGHTS.get((event.entity, event.action))
+        if weight is not None:
+            post_id = event.entity_id if event.entity == "post" else event.data.get("post_id")
+            self.apply(post_id, weight, event.data.get("at"))
+
+    def remove(self, post_id: int):
+        with self._lock:
+            self._scores.pop(post_id, None)
+            self._dirty.discard(post_id)
+            if self._top.pop(post_id, None) is not None:
+                self._rebuild_heap()
+
+    def top(self, db: Session, limit: int) -> list[tuple[int, float]]:
+        """Return up to `limit` (post_id, decayed score) pairs, best first."""
+        if not self._loaded:
+            self._load(db)
+        with self._lock:
+            growth = self._growth(time.time())
+            ranked = heapq.nlargest(limit, self._top.items(), key=lambda item: item[1])
+        return [(post_id, score / growth) for post_id, score in ranked if score > 0]
+
+
+@lru_cache
+def get_index() -> TrendingIndex:
+    get_engine()
+    settings = get_settings()
+    index = TrendingIndex(
+        half_life_seconds=settings.trending_half_life_hours * 3600,
+        capacity=settings.trending_capacity,
+        flush_seconds=settings.trending_flush_seconds,
+        session_factory=SessionLocal,
+    )
+    invalidation.subscribe(index.on_event)
+    return index
@@ -0,0 +1,121 @@
+"""
+Per-resource version counters for conditional GET.
+
+Every write stages an invalidation event on its session; before that session
+commits, the counters of the resources the events can change ("posts",
+"posts:{owner_id}", "users", "user:{id}", "comments:{post_id}") are bumped in
+the `resource_versions` table, in the same transaction as the write. List
+handlers read the counters they depend on through their own session and hash
+them, the caller and the query string into a weak ETag *before* querying, so a
+matching If-None-Match is answered with 304 without running the list query.
+
+Because the counters live in the database, every worker computes the same tag,
+and since they commit atomically with the rows they describe, a tag read from
+a replica is never newer or older than the rows served under it.
+"""
+import hashlib
+from functools import lru_cache
+
+from fastapi import Request, Response, status
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm import Session
+
+from . import invalidation, models
+from .database import SessionLocal, upsert
+
+EVERYTHING = "*"  # bumped by events that can change any list, e.g. an account deletion
+
+
+def _owner(user_id) -> tuple[str, ...]:
+    return (f"posts:{user_id}",) if user_id is not None else ()
+
+
+def keys_for(event: invalidation.Event) -> tuple[str, ...]:
+    """
+    "posts" covers lists across owners (timelines, mentions); "posts:{owner_id}"
+    covers one owner's posts and their counts; "user:{id}" a profile header.
+    """
+    data = event.data
+    if event.entity == "post":
+        owner = _owner(data.get("owner_id"))
+        if event.action == "created":
+            return ("posts", *owner, f"user:{data.get('owner_id')}")
+        if event.action == "deleted":
+            # Its comments go with it, and the owner's post count changes
+            return ("posts", *owner, f"user:{data.get('owner_id')}", f"comments:{event.entity_id}")
+        if event.action == "archived":
+            return ("posts", *owner, f"comments:{event.entity_id}")
+        return ("posts", *owner)
+    if event.entity == "comment":
+        if event.action == "updated":  # counts unchanged; the text shows in comments and mentions
+            return ("posts", f"comments:{data.get('post_id')}")
+        return ("posts", *_owner(data.get("post_owner_id")), f"comments:{data.get('post_id')}")
+    if event.entity == "user":
+        if event.action == "deleted":
+            return (EVERYTHING,)
+        if event.action in ("followed", "unfollowed"):
+            return ("users", f"user:{event.entity_id}", f"user:{data.get('follower_id')}")
+        return ("users",)
+    return ()
+
+
+def _upsert(db: Session, names: tuple[str, ...]):
+    table = models.ResourceVersion.__table__
+    rows = [{"name": name, "version": 1} for name in sorted(set(names))]
+    upsert(db, table, rows, [table.c.name], lambda new: {"version": table.c.version + 1})
+
+
+@sa_event.listens_for(SessionLocal, "before_commit")
+def _bump_staged(session):
+    names = tuple(name for event in invalidation.staged(session) for name in keys_for(event))
+    if names:
+        _upsert(session, names)
+        session.info.pop("resource_versions", None)  # counters read earlier are now stale
+
+
+class ResourceVersions:
+    def get(self, db: Session, *names: str) -> tuple[int, ...]:
+        # Read once per session, so the ETag and the caches a handler consults agree
+        known = db.info.setdefault("resource_versions", {})
+        wanted = (EVERYTHING, *names)
+        missing = [name for name in wanted if name not in known]
+        if missing:
+            found = dict(
+                db.query(models.ResourceVersion.name, models.ResourceVersion.version)
+                .filter(models.ResourceVersion.name.in_(missing))
+                .all()
+            )
+            known.update({name: found.get(name, 0) for name in missing})
+        return tuple(known[name] for name in wanted)
+
+    def etag(self, db: Session, names: tuple[str, ...], *vary) -> str:
+        digest = hashlib.blake2b(repr((self.get(db, *names), vary)).encode(), digest_size=8).hexdigest()
+        return f'W/"{digest}"'
+
+
+@lru_cache
+def get_versions() -> ResourceVersions:
+    return ResourceVersions()
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip() == "*" or candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(db: Session, request: Request, response: Response, names: tuple[str, ...], *vary) -> Response | None:
+    """
+    Return a 304 response when the client's copy is current; otherwise set the
+    ETag on `response` and return None. Call before querying, after auth, with
+    the session the list is read from.
+    """
+    etag = get_versions().etag(db, names, request.url.path, request.url.query, *vary)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
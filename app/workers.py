@@ -0,0 +1,113 @@
+"""
+Background recorders of this worker's own writes.
+
+Every worker sees every bus event, but a record of a write (a notification, an
+event log line) must be made once, by the worker that made the write. A
+`BatchWorker` subscribes to the bus, turns each local event into an item with
+`item_for()`, and a daemon thread hands queued items to `write()` in batches:
+everything that arrives within `flush_seconds` of the first item, at most
+`batch_size`, so a burst of requests costs one commit or fsync rather than one
+per request.
+"""
+import logging
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any
+
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatchWorker(ABC):
+    thread_name = "batch-worker"
+
+    def __init__(self, batch_size: int, flush_seconds: float, background: bool = True):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.background = background
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def item_for(self, event: invalidation.Event) -> Any | None:
+        """The item to queue for one of our own events, or None to skip it."""
+
+    @abstractmethod
+    def write(self, batch: list):
+        """Record one batch; an exception drops it."""
+
+    def close(self):
+        """Release what `write` holds open; called after a failed batch and on stop."""
+
+    def on_event(self, event: invalidation.Event):
+        if not invalidation.get_bus().is_local(event):
+            return
+        item = self.item_for(event)
+        if item is None:
+            return
+        if self.background:
+            self.start()
+        self._queue.put(item)
+
+    def drain(self):
+        """Write everything queued so far in the calling thread; for a worker without `background`."""
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self.write(batch)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _next_batch(self) -> tuple[list, bool]:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_seconds
+        return batch, False
+
+    def _run(self):
+        stopping = False
+        try:
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if not batch:
+                    continue
+                try:
+                    self.write(batch)
+                except Exception:
+                    logger.exception("%s: dropping %d records", self.thread_name, len(batch))
+                    self.close()
+        finally:
+            self.close()
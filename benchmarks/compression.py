@@ -0,0 +1,86 @@
+"""
+Bandwidth and latency of the list endpoints with compression and conditional GET.
+
+Seeds an in-memory database through the API (see app.testing), then for each
+endpoint measures the response size per Accept-Encoding, the server time of a
+full response and of a revalidation with If-None-Match (304), the SQL
+statements each runs, and the transfer time on a slow link.
+
+    python benchmarks/compression.py --users 20 --posts 200 --link-kbps 1600
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import testing  # noqa: E402
+from app.compression import _brotli  # noqa: E402
+
+ENDPOINTS = ["/posts/with_counts/?limit=50", "/users/", "/users/me"]
+
+
+def seed(client, users: int, posts: int) -> list[dict]:
+    headers = [testing.sign_up(client, f"user{i}") for i in range(users)]
+    post_ids = []
+    for i in range(posts):
+        body = {"title": f"Post number {i}", "content": f"Post {i} about #weconnect, written for the benchmark run."}
+        post_ids.append(client.post("/posts/", json=body, headers=headers[i % users]).json()["id"])
+    for i, user_headers in enumerate(headers):
+        client.post(f"/users/{(i + 1) % users + 1}/follow", headers=user_headers)
+        for post_id in post_ids[i::7]:
+            client.post(f"/posts/{post_id}/like", headers=user_headers)
+    return headers
+
+
+def timed(client, url: str, headers: dict, runs: int) -> tuple[float, object]:
+    samples, response = [], None
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=20, help="requests per measurement (median reported)")
+    parser.add_argument("--link-kbps", type=float, default=1600, help="client link speed for transfer estimates")
+    args = parser.parse_args()
+
+    engine = testing.create_test_engine()
+    api = testing.create_test_app(engine)
+    encodings = ["identity", "gzip"] + (["br"] if _brotli() else [])
+
+    with testing.rollback_session(engine):
+        client = testing.BudgetedClient(api, engine, enforce=False)
+        auth = seed(client, args.users, args.posts)[0]
+
+        def transfer_ms(size: int) -> float:
+            return size * 8 / args.link_kbps
+
+        print(f"{'endpoint':<30} {'encoding':<9} {'bytes':>8} {'server ms':>9} {'link ms':>8} {'queries':>7}")
+        for url in ENDPOINTS:
+            for encoding in encodings:
+                server_ms, response = timed(client, url, {**auth, "Accept-Encoding": encoding}, args.runs)
+                size = int(response.headers["content-length"])
+                print(
+                    f"{url:<30} {encoding:<9} {size:>8} {server_ms:>9.2f} "
+                    f"{transfer_ms(size):>8.1f} {client.measurements[-1].queries:>7}"
+                )
+            etag = response.headers["etag"]
+            server_ms, response = timed(client, url, {**auth, "If-None-Match": etag}, args.runs)
+            assert response.status_code == 304, response.status_code
+            print(
+                f"{url:<30} {'304':<9} {0:>8} {server_ms:>9.2f} "
+                f"{transfer_ms(0):>8.1f} {client.measurements[-1].queries:>7}"
+            )
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
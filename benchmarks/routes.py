@@ -0,0 +1,131 @@
+"""
+Query counts and latency of every users/posts/comments/auth route, checked
+against app.testing.ROUTE_BUDGETS.
+
+Each round runs a scripted session (sign-ups, posts, likes, comments, follows,
+every read, then the deletes) on a private in-memory SQLite database inside a
+rolled-back transaction, so rounds are deterministic and independent. Workers
+run in separate processes, one database each.
+
+    python benchmarks/routes.py --rounds 5 --workers 4
+
+Exits with code 1 when a route has no budget or goes over it: its worst query
+count over the query budget, or its median latency over the latency ceiling
+times --latency-scale (or BUDGET_LATENCY_SCALE; raise it on slow or shared hosts).
+"""
+import argparse
+import os
+import statistics
+import sys
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import testing  # noqa: E402
+
+
+def scenario(client, posts_per_user: int = 5):
+    alice = testing.sign_up(client, "alice")
+    bob = testing.sign_up(client, "bob")
+    carol = testing.sign_up(client, "carol")
+    users = {user["username"]: user["id"] for user in client.get("/users/", headers=alice).json()}
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+
+    post_ids = [
+        client.post("/posts/", json={"title": f"post {i}", "content": f"#bench post {i} for @bob"}, headers=alice).json()["id"]
+        for i in range(posts_per_user)
+    ]
+    for headers in (bob, carol):
+        client.post(f"/users/{alice_id}/follow", headers=headers)
+        for post_id in post_ids:
+            client.post(f"/posts/{post_id}/like", headers=headers)
+            client.post(f"/comments/{post_id}", json={"content": "nice #bench"}, headers=headers)
+    comment_id = client.post(f"/comments/{post_ids[0]}", json={"content": "typo"}, headers=bob).json()["id"]
+
+    for _ in range(2):  # cold, then warm caches
+        client.get("/posts/", headers=bob)
+        client.get("/posts/with_counts/", headers=bob)
+        client.get("/posts/trending", headers=bob)
+        client.get("/posts/mine", headers=alice)
+        client.get(f"/posts/user/{alice_id}", headers=bob)
+        client.get(f"/posts/{post_ids[0]}", headers=bob)
+        client.get(f"/comments/{post_ids[0]}")
+        client.get("/users/", headers=bob)
+        client.get("/users/me", headers=alice)
+        client.get("/users/me/mentions", headers=bob)
+        client.get(f"/users/{alice_id}/profile", headers=bob)
+
+    client.put(f"/comments/{comment_id}", json={"content": "fixed"}, headers=bob)
+    client.delete(f"/comments/{comment_id}", headers=bob)
+    client.post(f"/posts/{post_ids[0]}/unlike", headers=bob)
+    client.delete(f"/posts/{post_ids[-1]}", headers=alice)
+    client.post(f"/users/{users['bob']}/follow", headers=carol)
+    client.post(f"/users/{users['bob']}/unfollow", headers=carol)
+    client.delete("/users/me", headers=carol)
+
+
+def run_worker(rounds: int) -> list[tuple[str, str, int, int, float]]:
+    engine = testing.create_test_engine()
+    api = testing.create_test_app(engine)
+    with testing.rollback_session(engine):
+        scenario(testing.BudgetedClient(api, engine, enforce=False))  # warm-up, not measured
+    rows = []
+    for _ in range(rounds):
+        with testing.rollback_session(engine):
+            client = testing.BudgetedClient(api, engine, enforce=False)
+            scenario(client)
+            rows += [(m.method, m.path, m.status_code, m.queries, m.ms) for m in client.measurements]
+    engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="scenario runs per worker")
+    parser.add_argument("--workers", type=int, default=1, help="processes, e.g. one per core")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=float(os.environ.get("BUDGET_LATENCY_SCALE", 1)),
+        help="multiplier for the latency ceilings",
+    )
+    args = parser.parse_args()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(run_worker, [args.rounds] * args.workers))
+
+    by_route = defaultdict(list)
+    errors = []
+    for rows in results:
+        for method, path, status_code, queries, ms in rows:
+            by_route[(method, path)].append((queries, ms))
+            if status_code >= 400:
+                errors.append(f"{method} {path} -> {status_code}")
+
+    failed = False
+    print(f"{'route':<38} {'calls':>5} {'queries':>7} {'budget':>6} {'p50 ms':>7} {'max ms':>7} {'budget':>6}")
+    for key in sorted(testing.budgeted_routes() | by_route.keys(), key=lambda k: (k[1], k[0])):
+        budget = testing.ROUTE_BUDGETS.get(key)
+        samples = by_route.get(key, [])
+        if budget is None or not samples:
+            failed = True
+            print(f"{key[0] + ' ' + key[1]:<38} {'no budget' if budget is None else 'not exercised'}")
+            continue
+        queries = max(q for q, _ in samples)
+        times = [ms for _, ms in samples]
+        max_ms = budget.max_ms * args.latency_scale
+        over = queries > budget.max_queries or statistics.median(times) > max_ms
+        failed |= over
+        print(
+            f"{key[0] + ' ' + key[1]:<38} {len(samples):>5} {queries:>7} {budget.max_queries:>6} "
+            f"{statistics.median(times):>7.1f} {max(times):>7.1f} {max_ms:>6.0f}{'  OVER' if over else ''}"
+        )
+    if errors:
+        failed = True
+        print("\nunexpected error responses:\n  " + "\n  ".join(sorted(set(errors))))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Import-time cost of the API, per module.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the slowest modules by cumulative import time. Use --budget-ms to fail
+(exit code 1) when the total import of app.main gets slower than a budget.
+
+    python benchmarks/startup.py --top 25 --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(target: str) -> dict[str, tuple[int, int]]:
+    """Return {module: (self_us, cumulative_us)} for one cold import."""
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    timings = {}
+    for match in LINE.finditer(proc.stderr):
+        timings[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float)
+    args = parser.parse_args()
+
+    runs = [measure(args.target) for _ in range(args.runs)]
+    modules = set.intersection(*(set(run) for run in runs))
+    median = {
+        module: (
+            statistics.median(run[module][0] for run in runs),
+            statistics.median(run[module][1] for run in runs),
+        )
+        for module in modules
+    }
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, (self_us, cumulative_us) in sorted(median.items(), key=lambda item: -item[1][1])[: args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+
+    local = sum(self_us for module, (self_us, _) in median.items() if module.split(".")[0] == "app")
+    total_ms = median[args.target][1] / 1000
+    print(f"\n{args.target}: {total_ms:.1f} ms total, {local / 1000:.1f} ms in app.* itself (median of {args.runs})")
+
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"over budget: {total_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Building an app changes no process state; only one configured app is active at a time."""
+import pytest
+from sqlalchemy import create_engine
+
+from app import testing
+from app.config import get_settings
+from app.database import get_engine
+from app.main import activate, create_app, deactivate
+
+
+def test_building_apps_leaves_the_active_one_alone(api):
+    active = (get_settings(), get_engine())
+    other = create_engine("sqlite://")
+    try:
+        first = create_app(testing.test_settings(secret_key="first"), other)
+        create_app(testing.test_settings(secret_key="second"))
+        assert (get_settings(), get_engine()) == active
+
+        with pytest.raises(RuntimeError):
+            activate(first)
+        assert (get_settings(), get_engine()) == active
+
+        deactivate(first)  # not active: a no-op
+        assert (get_settings(), get_engine()) == active
+    finally:
+        other.dispose()
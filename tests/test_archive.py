@@ -0,0 +1,29 @@
+"""The archive job moves old posts, purges soft-deleted rows of any age, and reads fall back to it."""
+from datetime import datetime, timedelta, timezone
+
+from app import archive, models, testing
+
+
+def test_archive_moves_old_posts_and_purges_deleted_ones(client, db_session):
+    alice = testing.sign_up(client, "alice")
+    bob = testing.sign_up(client, "bob")
+
+    def post(title):
+        return client.post("/posts/", json={"title": title, "content": title}, headers=alice).json()["id"]
+
+    old, deleted, young = post("old"), post("deleted"), post("young")
+    client.post(f"/comments/{old}", json={"content": "kept"}, headers=bob)
+    gone = client.post(f"/comments/{young}", json={"content": "gone"}, headers=bob).json()["id"]
+    client.delete(f"/posts/{deleted}", headers=alice)
+    client.delete(f"/comments/{gone}", headers=bob)
+    db_session.query(models.Post).filter_by(id=old).update(
+        {"timestamp": datetime.now(timezone.utc) - timedelta(days=400)}
+    )
+
+    assert archive.archive(db_session, older_than_days=365) == 2
+
+    assert {post_id for (post_id,) in db_session.query(models.Post.id)} == {young}
+    assert db_session.query(models.Comment).count() == 0
+    assert {row.id for row in db_session.query(models.PostArchive)} == {old}
+    assert [c["content"] for c in client.get(f"/comments/{old}").json()] == ["kept"]
+    assert client.get(f"/comments/{young}").json() == []
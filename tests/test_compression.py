@@ -0,0 +1,78 @@
+"""Accept-Encoding negotiation, compressed list responses and their 304 revalidation."""
+import pytest
+
+from app import compression, testing
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, brotli_available, expected",
+    [
+        ("gzip, deflate, br", True, "br"),
+        ("gzip, deflate, br", False, "gzip"),
+        ("br;q=0, gzip", True, "gzip"),
+        ("gzip;q=0", True, None),
+        ("gzip;q=0, br;q=0", True, None),
+        ("*", True, "br"),
+        ("*", False, "gzip"),
+        ("*;q=0, gzip", True, "gzip"),
+        ("br;q=0, *", True, "gzip"),
+        ("*;q=0", True, None),
+        ("GZIP;q=0.5", False, "gzip"),
+        ("gzip;q=oops", False, None),
+        ("identity", True, None),
+        ("", True, None),
+    ],
+)
+def test_negotiate(accept_encoding, brotli_available, expected):
+    assert compression.negotiate(accept_encoding, brotli_available) == expected
+
+
+def _timeline(client) -> dict:
+    alice = testing.sign_up(client, "alice")
+    for i in range(20):
+        client.post("/posts/", json={"title": f"post {i}", "content": "lorem ipsum " * 10}, headers=alice)
+    return alice
+
+
+def test_large_lists_are_gzipped(client):
+    alice = _timeline(client)
+    plain = client.get("/posts/", headers={**alice, "Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+
+    zipped = client.get("/posts/", headers={**alice, "Accept-Encoding": "gzip"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["vary"]
+    assert int(zipped.headers["content-length"]) < len(plain.content)
+    assert zipped.json() == plain.json()  # httpx decodes it
+
+
+def test_brotli_when_installed(client):
+    pytest.importorskip("brotli")  # httpx decodes br only with it
+    alice = _timeline(client)
+    response = client.get("/posts/", headers={**alice, "Accept-Encoding": "br, gzip"})
+    assert response.headers["content-encoding"] == "br"
+    assert len(response.json()) == 10
+
+
+def test_revalidation_skips_the_list_query(client):
+    alice = _timeline(client)
+    full = client.get("/posts/", headers={**alice, "Accept-Encoding": "gzip"})
+    full_queries = client.measurements[-1].queries
+
+    cached = client.get("/posts/", headers={**alice, "Accept-Encoding": "gzip", "If-None-Match": full.headers["etag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert "content-encoding" not in cached.headers
+    assert cached.headers["etag"] == full.headers["etag"]
+    assert client.measurements[-1].queries < full_queries
+
+    client.post("/posts/", json={"title": "new", "content": "changes the page"}, headers=alice)
+    stale = client.get("/posts/", headers={**alice, "If-None-Match": full.headers["etag"]})
+    assert stale.status_code == 200
+    assert stale.headers["etag"] != full.headers["etag"]
+
+
+def test_small_bodies_are_sent_as_is(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"message": "Welcome to the API"}
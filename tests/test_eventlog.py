@@ -0,0 +1,78 @@
+"""The event log survives rotation and merges workers' segments, and replaying it rebuilds counters and timelines."""
+import os
+
+from app import eventlog, invalidation, models, testing
+
+
+def _post(client, headers: dict, title: str) -> int:
+    return client.post("/posts/", json={"title": title, "content": title}, headers=headers).json()["id"]
+
+
+def test_replay_rebuilds_counters_and_timelines(client, db_session, tmp_path):
+    writer = eventlog.EventLogWriter(str(tmp_path), segment_bytes=256, flush_seconds=0.01, batch_size=2)
+    invalidation.subscribe(writer.on_event)
+    alice, bob, carol = (testing.sign_up(client, name) for name in ("alice", "bob", "carol"))
+    alice_id, bob_id, carol_id = (client.get("/users/me", headers=h).json()["id"] for h in (alice, bob, carol))
+
+    first = _post(client, alice, "first")
+    second = _post(client, bob, "second")
+    dropped = _post(client, bob, "dropped")
+    third = _post(client, alice, "third")
+    client.delete(f"/posts/{dropped}", headers=bob)
+    for follower, followee_id in ((carol, alice_id), (carol, bob_id), (bob, alice_id)):
+        client.post(f"/users/{followee_id}/follow", headers=follower)
+    client.post(f"/users/{alice_id}/unfollow", headers=bob)
+    client.post(f"/posts/{first}/like", headers=carol)
+    client.post(f"/posts/{first}/like", headers=bob)
+    client.post(f"/posts/{first}/unlike", headers=bob)
+    client.post(f"/comments/{third}", json={"content": "nice"}, headers=carol)
+    writer.stop()
+
+    assert len(eventlog.segments(str(tmp_path))[str(os.getpid())]) > 1  # rotated
+    records = list(eventlog.read_records(str(tmp_path)))
+    assert [record["ts"] for record in records] == sorted(record["ts"] for record in records)
+
+    state = eventlog.replay(records)
+    assert state.users == {alice_id, bob_id, carol_id}
+    assert state.timeline(carol_id) == [third, second, first]
+    assert state.timeline(bob_id) == []
+    assert dropped not in state.posts
+    assert state.likes[first] == {carol_id}
+    assert list(state.comments[third].values()) == [carol_id]
+
+    # Counters wiped by hand come back from the log alone
+    db_session.query(models.UserStats).update(
+        {"post_count": 0, "follower_count": 0, "following_count": 0, "last_post_at": None}
+    )
+    db_session.commit()
+    assert eventlog.apply_stats(db_session, state) == 3
+    rebuilt = {
+        row.user_id: (row.post_count, row.follower_count, row.following_count)
+        for row in db_session.query(models.UserStats).filter(models.UserStats.user_id.in_(state.users))
+    }
+    assert rebuilt == {alice_id: (2, 1, 0), bob_id: (1, 1, 0), carol_id: (0, 0, 2)}
+    assert db_session.get(models.UserStats, alice_id).last_post_at is not None
+
+
+def test_segments_of_all_workers_merge_by_time(tmp_path):
+    def segment(name: str, *lines: str):
+        (tmp_path / name).write_text("".join(line + "\n" for line in lines))
+
+    segment(
+        "segment-0000000000001-100.jsonl",
+        '{"ts":1.0,"seq":1,"entity":"user","id":1,"action":"created"}',
+        '{"ts":3.0,"seq":2,"entity":"post","id":10,"action":"created","data":{"owner_id":1}}',
+    )
+    segment("segment-0000000000002-100.jsonl", '{"ts":5.0,"seq":3,"entity":"post","id":11,"action":"created",')
+    segment(
+        "segment-0000000000001-200.jsonl",
+        '{"ts":2.0,"seq":1,"entity":"user","id":2,"action":"created"}',
+        '{"ts":4.0,"seq":2,"entity":"user","id":1,"action":"followed","data":{"follower_id":2}}',
+    )
+    (tmp_path / "notes.txt").write_text("not a segment")
+
+    records = list(eventlog.read_records(str(tmp_path)))
+    assert [record["ts"] for record in records] == [1.0, 2.0, 3.0, 4.0]  # the torn tail record is skipped
+    state = eventlog.replay(records)
+    assert state.timeline(2) == [10]
+    assert dict(state.followers) == {1: {2}}
@@ -0,0 +1,30 @@
+"""SQLiteBus carries events between workers sharing one file, without echoing a worker's own."""
+import pytest
+
+from app import invalidation
+
+
+def test_base_bus_is_abstract():
+    with pytest.raises(TypeError):
+        invalidation.InvalidationBus()
+
+
+def test_sqlite_bus_delivers_to_other_workers_once(tmp_path):
+    path = str(tmp_path / "bus.db")
+    first, second = invalidation.SQLiteBus(path), invalidation.SQLiteBus(path)
+    seen_by_first, seen_by_second = [], []
+    first.subscribe(seen_by_first.append)
+    second.subscribe(seen_by_second.append)
+
+    first.publish("post", 7, "liked", user_id=3)
+    assert [(e.entity, e.entity_id, e.action, e.data) for e in seen_by_first] == [("post", 7, "liked", {"user_id": 3})]
+    assert first.is_local(seen_by_first[0])
+
+    # Polling never replays our own events; the other worker gets them exactly once
+    first.poll()
+    second.poll()
+    second.poll()
+    assert len(seen_by_first) == 1
+    assert [(e.entity, e.entity_id, e.data) for e in seen_by_second] == [("post", 7, {"user_id": 3})]
+    assert not second.is_local(seen_by_second[0])
+    assert seen_by_second[0].origin == first.origin
@@ -0,0 +1,90 @@
+"""Uploads stream to content-addressed storage, identical files are stored once, and Range works."""
+import dataclasses
+import os
+
+from python_multipart.multipart import MultipartParser
+
+from app import media, testing
+from app.config import get_settings
+
+BOUNDARY = "weconnect-test-boundary"
+
+
+def _gif() -> bytes:
+    return b"GIF89a\x01\x00\x01\x00\x00\x00\x00" + os.urandom(4096) + b";"
+
+
+def _multipart(payload: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.gif"\r\n'
+        "Content-Type: image/gif\r\n\r\n"
+    ).encode() + payload + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _upload(client, headers: dict, body: bytes, chunk_size: int = 1000):
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return client.post(
+        "/media/",
+        content=chunks,
+        headers={**headers, "Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+    )
+
+
+def test_parts_are_written_as_they_arrive(tmp_path):
+    payload = _gif()
+    body = _multipart(payload)
+    writer = media._FilePartWriter(str(tmp_path / "upload"), max_bytes=len(payload))
+    parser = MultipartParser(BOUNDARY, writer.callbacks())
+
+    parser.write(body[:2000])
+    # Hashed and written out before the rest of the body exists
+    assert 0 < writer.size < len(payload)
+    parser.write(body[2000:])
+    parser.finalize()
+    writer.close()
+    assert (tmp_path / "upload").read_bytes() == payload
+
+
+def test_identical_uploads_share_one_file(client):
+    alice = testing.sign_up(client, "alice")
+    payload = _gif()
+
+    first = _upload(client, alice, _multipart(payload))
+    second = _upload(client, alice, _multipart(payload), chunk_size=333)
+    assert first.status_code == second.status_code == 201
+    first, second = first.json(), second.json()
+    assert first["id"] != second["id"]
+    assert first["sha256"] == second["sha256"]
+    assert (first["size"], first["content_type"]) == (len(payload), "image/gif")
+
+    path = media.blob_path(first["sha256"])
+    with open(path, "rb") as stored:
+        assert stored.read() == payload
+    assert os.listdir(os.path.join(get_settings().media_root, "tmp")) == []
+
+
+def test_oversized_upload_is_rejected_without_leftovers(client, monkeypatch):
+    alice = testing.sign_up(client, "alice")
+    limited = dataclasses.replace(get_settings(), media_max_bytes=1024)
+    monkeypatch.setattr(media, "get_settings", lambda: limited)
+
+    response = _upload(client, alice, _multipart(_gif()))
+    assert response.status_code == 413
+    assert os.listdir(os.path.join(limited.media_root, "tmp")) == []
+
+
+def test_range_and_conditional_reads(client):
+    alice = testing.sign_up(client, "alice")
+    payload = _gif()
+    attachment = _upload(client, alice, _multipart(payload)).json()
+
+    partial = client.get(f"/media/{attachment['id']}", headers={"Range": "bytes=0-5"})
+    assert partial.status_code == 206
+    assert partial.content == payload[:6]
+    assert partial.headers["content-range"] == f"bytes 0-5/{len(payload)}"
+
+    full = client.get(f"/media/{attachment['id']}")
+    assert full.content == payload
+    cached = client.get(f"/media/{attachment['id']}", headers={"If-None-Match": full.headers["etag"]})
+    assert cached.status_code == 304
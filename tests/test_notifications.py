@@ -0,0 +1,36 @@
+"""Likes within one bucket aggregate into a single notification row and message."""
+import time
+
+from app import models, notifications, testing
+
+LIKES = 40
+
+
+def test_likes_in_one_bucket_share_a_row(client, db_session):
+    # One bucket for the whole test, however long signing everyone up takes
+    notifications.get_worker().bucket_seconds = 10 ** 9
+    alice = testing.sign_up(client, "alice")
+    post_id = client.post("/posts/", json={"title": "hello", "content": "like me"}, headers=alice).json()["id"]
+    for i in range(LIKES):
+        fan = testing.sign_up(client, f"fan{i}")
+        assert client.post(f"/posts/{post_id}/like", headers=fan).status_code == 204
+
+    assert db_session.query(models.Notification).count() == 1
+    (notification,) = client.get("/notifications/", headers=alice).json()
+    assert notification["count"] == LIKES
+    assert notification["message"] == f"fan{LIKES - 1} and {LIKES - 1} others liked your post"
+    assert client.get("/notifications/unread_count", headers=alice).json() == {"unread": 1}
+
+
+def test_a_batch_folds_into_one_upsert_per_bucket(db_session):
+    now = time.time() // 3600 * 3600 + 1
+    events = [notifications.NotificationEvent(1, "like", 7, actor, now + actor) for actor in range(2, 2 + LIKES)]
+    events.append(notifications.NotificationEvent(1, "comment", 7, 2, now))
+
+    notifications.write_batch(db_session, events, bucket_seconds=3600)
+    notifications.write_batch(db_session, events[:2], bucket_seconds=3600)
+
+    rows = {row.type: row for row in db_session.query(models.Notification)}
+    assert rows.keys() == {"like", "comment"}
+    assert rows["like"].count == LIKES + 2
+    assert rows["like"].last_actor_id == 3
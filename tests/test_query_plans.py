@@ -0,0 +1,46 @@
+"""The composite indexes of revision 0002 are what the hot query shapes actually use."""
+import re
+
+import pytest
+from sqlalchemy import and_, create_engine, select
+
+from app import migrations, models
+
+_PLAN_INDEX = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+Post, Comment, Follow = models.Post, models.Comment, models.Follow
+
+# The timeline, user timeline/profile, comment page and follower query shapes
+QUERIES = {
+    "ix_posts_timestamp": select(Post)
+    .where(Post.deleted_at.is_(None))
+    .order_by(Post.timestamp.desc())
+    .limit(10),
+    "ix_posts_owner_id_timestamp": select(Post)
+    .where(Post.owner_id == 1, Post.deleted_at.is_(None))
+    .order_by(Post.timestamp.desc())
+    .limit(10),
+    "ix_comments_post_id_timestamp": select(Post.id, Comment)
+    .outerjoin(Comment, and_(Comment.post_id == Post.id, Comment.deleted_at.is_(None)))
+    .where(Post.id == 1, Post.deleted_at.is_(None))
+    .order_by(Comment.timestamp.asc())
+    .limit(10),
+    "ix_follows_followee_id_follower_id": select(Follow.c.follower_id).where(Follow.c.followee_id == 1),
+}
+
+
+@pytest.fixture(scope="module")
+def migrated():
+    engine = create_engine("sqlite://")
+    migrations.upgrade(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize("index_name", QUERIES)
+def test_query_uses_its_index(migrated, index_name):
+    sql = QUERIES[index_name].compile(migrated, compile_kwargs={"literal_binds": True})
+    with migrated.connect() as connection:
+        plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    used = {name for detail in plan for name in _PLAN_INDEX.findall(detail)}
+    assert index_name in used, plan
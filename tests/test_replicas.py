@@ -0,0 +1,82 @@
+"""Reads go to replicas, except a client's own writes, and a broken replica is ejected."""
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.orm import declarative_base
+
+from app import database
+
+NoteBase = declarative_base()
+
+
+class Note(NoteBase):
+    __tablename__ = "notes"
+
+    id = Column(Integer, primary_key=True)
+    body = Column(String(50))
+
+
+def _database(path):
+    engine = create_engine(f"sqlite:///{path}")
+    NoteBase.metadata.create_all(engine)
+    return engine
+
+
+def _notes(db) -> int:
+    return db.execute(text("SELECT count(*) FROM notes")).scalar_one()
+
+
+@pytest.fixture
+def primary(tmp_path, monkeypatch):
+    engine = _database(tmp_path / "primary.db")
+    monkeypatch.setitem(database.SessionLocal.kw, "bind", engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def router(tmp_path, primary, monkeypatch):
+    _database(tmp_path / "replica.db").dispose()  # never receives the write: maximal lag
+    router = database.ReplicaRouter([f"sqlite:///{tmp_path / 'replica.db'}"], eject_seconds=30, sticky_seconds=5)
+    monkeypatch.setattr(database, "get_replica_router", lambda: router)
+    return router
+
+
+def _write_as(client_key: str):
+    with database.SessionLocal(info={"client_key": client_key}) as db:
+        db.add(Note(body="hello"))
+        db.commit()
+
+
+def test_writer_reads_its_own_write_from_the_primary(router):
+    _write_as("alice")
+    db, replica = router.session("alice")
+    with db:
+        assert replica is None
+        assert _notes(db) == 1
+
+
+def test_other_clients_read_the_stale_replica(router):
+    _write_as("alice")
+    db, replica = router.session("bob")
+    with db:
+        assert replica == 0
+        assert _notes(db) == 0
+
+
+def test_unreachable_replica_is_ejected(tmp_path, router):
+    broken = database.ReplicaRouter(
+        [f"sqlite:///{tmp_path / 'missing' / 'replica.db'}", f"sqlite:///{tmp_path / 'replica.db'}"],
+        eject_seconds=30,
+        sticky_seconds=5,
+    )
+    for _ in range(3):
+        db, replica = broken.session("bob")
+        db.close()
+        assert replica == 1
+    assert list(broken._ejected_until) == [0]
+
+    only_broken = database.ReplicaRouter([f"sqlite:///{tmp_path / 'missing' / 'replica.db'}"], 30, 5)
+    db, replica = only_broken.session("bob")
+    with db:
+        assert replica is None  # every replica down: read from the primary
+        assert _notes(db) == 0
@@ -0,0 +1,63 @@
+"""Every route has a budget, and a typical session stays within them."""
+from app import testing
+
+
+def test_every_route_has_a_budget():
+    assert testing.missing_budgets() == set()
+
+
+def test_session_within_budgets(client):
+    alice = testing.sign_up(client, "alice")
+    bob = testing.sign_up(client, "bob")
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+
+    post_id = client.post("/posts/", json={"title": "hello", "content": "#intro for @bob"}, headers=alice).json()["id"]
+    assert client.post(f"/posts/{post_id}/like", headers=bob).status_code == 204
+    comment = client.post(f"/comments/{post_id}", json={"content": "welcome"}, headers=bob).json()
+    assert client.post(f"/users/{alice_id}/follow", headers=bob).status_code == 204
+
+    assert [post["id"] for post in client.get("/posts/", headers=bob).json()] == [post_id]
+    assert client.get(f"/comments/{post_id}").json()[0]["content"] == "welcome"
+    profile = client.get(f"/users/{alice_id}/profile", headers=bob).json()
+    assert profile["is_following"] and profile["post_count"] == 1
+    assert client.get("/users/me/mentions", headers=bob).json()["items"][0]["post"]["id"] == post_id
+
+    # The harness drains the notification queue after each request
+    assert client.get("/notifications/unread_count", headers=alice).json() == {"unread": 3}
+
+    assert client.delete(f"/comments/{comment['id']}", headers=bob).status_code == 204
+    assert client.delete(f"/posts/{post_id}", headers=alice).status_code == 204
+    assert client.get(f"/comments/{post_id}").json() == []
+    assert client.violations() == []
+
+
+def _author(client, name: str, posts: int):
+    headers = testing.sign_up(client, name)
+    fan = testing.sign_up(client, f"{name}-fan")
+    user_id = client.get("/users/me", headers=headers).json()["id"]
+    for i in range(posts):
+        post_id = client.post(
+            "/posts/", json={"title": f"post {i}", "content": f"#tag {i} for @{name}-fan"}, headers=headers
+        ).json()["id"]
+        client.post(f"/posts/{post_id}/like", headers=fan)
+        client.post(f"/comments/{post_id}", json={"content": "#tag thanks"}, headers=fan)
+    client.post(f"/users/{user_id}/follow", headers=fan)
+    return headers, fan, user_id
+
+
+def _queries_per_route(client, headers, fan, user_id) -> dict:
+    start = len(client.measurements)
+    client.get("/users/me", headers=headers)
+    client.get(f"/users/{user_id}/profile", headers=fan)
+    client.get("/posts/mine", headers=headers)
+    client.get(f"/posts/user/{user_id}", headers=fan)
+    client.get("/users/me/mentions", headers=fan)
+    client.delete("/users/me", headers=headers)
+    return {(m.method, m.path): m.queries for m in client.measurements[start:]}
+
+
+def test_query_counts_do_not_grow_with_data(client):
+    light = _queries_per_route(client, *_author(client, "light", 1))
+    heavy = _queries_per_route(client, *_author(client, "heavy", 8))
+    assert heavy == light
+    assert client.violations() == []
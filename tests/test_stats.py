@@ -0,0 +1,25 @@
+"""The hot-profile cache never serves a summary older than the version its reader has seen."""
+from app import stats, testing
+from app.database import SessionLocal
+
+
+def test_summary_cached_from_a_lagging_replica_is_refreshed(client):
+    alice = testing.sign_up(client, "alice")
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+    before = client.get(f"/users/{alice_id}/profile", headers=alice).json()
+    client.post("/posts/", json={"title": "hello", "content": "first"}, headers=alice)
+
+    # A replica read that lost the race with the eviction caches the pre-post profile
+    cache = stats.get_profile_cache()
+    stale = {key: before[key] for key in ("id", "username", "post_count", "followers_count", "following_count")}
+    cache.set(alice_id, ((0, 0), {**stale, "last_post_at": None}))
+
+    assert client.get(f"/users/{alice_id}/profile", headers=alice).json()["post_count"] == 1
+    fresh_version, summary = cache.get(alice_id)
+    assert summary["post_count"] == 1 and fresh_version > (0, 0)
+
+    # A reader still on the old version is served the newer entry and leaves it in place
+    with SessionLocal() as lagging:
+        lagging.info["resource_versions"] = {"*": 0, f"user:{alice_id}": 0}
+        assert stats.profile_summary(lagging, alice_id)["post_count"] == 1
+    assert cache.get(alice_id)[0] == fresh_version
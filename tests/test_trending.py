@@ -0,0 +1,46 @@
+"""Trending ranks by decayed engagement, and undoing an engagement takes back exactly what it added."""
+import time
+
+import pytest
+
+from app import trending
+
+HOUR = 3600
+
+
+def _index() -> trending.TrendingIndex:
+    return trending.TrendingIndex(half_life_seconds=HOUR, capacity=10, flush_seconds=HOUR)
+
+
+def test_unlike_takes_back_the_original_like(db_session):
+    index = _index()
+    liked_at = time.time() - 2 * HOUR
+    index.bump(db_session, 1, trending.LIKE_WEIGHT, at=liked_at)
+    index.bump(db_session, 2, trending.LIKE_WEIGHT, at=liked_at)
+    index.bump(db_session, 1, trending.COMMENT_WEIGHT)
+
+    # Undone two half-lives later: subtracting a like made *now* would leave post 1 at -2
+    index.bump(db_session, 1, -trending.LIKE_WEIGHT, at=liked_at)
+
+    (first, first_score), (second, second_score) = index.top(db_session, 10)
+    assert (first, second) == (1, 2)
+    assert first_score == pytest.approx(trending.COMMENT_WEIGHT)
+    assert second_score == pytest.approx(trending.LIKE_WEIGHT / 4)
+
+
+def test_undone_post_drops_out_of_the_ranking(db_session):
+    index = _index()
+    liked_at = time.time() - HOUR
+    index.bump(db_session, 1, trending.LIKE_WEIGHT, at=liked_at)
+    index.bump(db_session, 2, trending.LIKE_WEIGHT)
+    index.bump(db_session, 1, -trending.LIKE_WEIGHT, at=liked_at)
+
+    assert [post_id for post_id, _ in index.top(db_session, 10)] == [2]
+    assert index._scores[1] == pytest.approx(0.0, abs=1e-9)
+
+
+def test_undo_of_an_unrecorded_event_never_goes_negative(db_session):
+    index = _index()
+    index.bump(db_session, 1, -trending.COMMENT_WEIGHT)
+    index.apply(1, -trending.LIKE_WEIGHT)
+    assert index._scores[1] == 0.0
@@ -0,0 +1,51 @@
+"""List versions commit with the write that changes them, and per-owner lists move only with their owner."""
+import pytest
+
+from app import invalidation, models, testing
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def engine(api):
+    engine = testing.create_test_engine()
+    yield engine
+    engine.dispose()
+
+
+def _counters(engine) -> dict:
+    with SessionLocal(bind=engine) as db:
+        return dict(db.query(models.ResourceVersion.name, models.ResourceVersion.version))
+
+
+def test_counters_are_bumped_in_the_writing_transaction(engine):
+    published = []
+    invalidation.subscribe(published.append)
+    with SessionLocal(bind=engine) as db:
+        invalidation.stage(db, "post", 1, "liked", user_id=2, owner_id=7)
+        assert published == []  # nothing leaves the transaction before it commits
+        db.commit()
+    assert _counters(engine) == {"posts": 1, "posts:7": 1}
+    assert [(event.entity, event.entity_id, event.action) for event in published] == [("post", 1, "liked")]
+
+    with SessionLocal(bind=engine) as db:
+        invalidation.stage(db, "post", 1, "unliked", owner_id=7)
+        db.rollback()
+        db.commit()
+    assert _counters(engine) == {"posts": 1, "posts:7": 1}
+    assert len(published) == 1
+
+
+def test_owner_lists_change_only_with_their_owner(client):
+    alice = testing.sign_up(client, "alice")
+    bob = testing.sign_up(client, "bob")
+    alice_id = client.get("/users/me", headers=alice).json()["id"]
+    post_id = client.post("/posts/", json={"title": "hi", "content": "first"}, headers=alice).json()["id"]
+
+    page = client.get(f"/posts/user/{alice_id}", headers=bob)
+    current = {**bob, "If-None-Match": page.headers["etag"]}
+
+    client.post("/posts/", json={"title": "hi", "content": "someone else's"}, headers=bob)
+    assert client.get(f"/posts/user/{alice_id}", headers=current).status_code == 304
+
+    client.post(f"/posts/{post_id}/like", headers=bob)
+    assert client.get(f"/posts/user/{alice_id}", headers=current).status_code == 200